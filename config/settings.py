@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ClientIPMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Whitenoise for static files
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -48,6 +49,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ActivityLogBufferMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -76,9 +78,33 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASE_URL = os.getenv('DATABASE_URL')
 
 if DATABASE_URL:
+    # Persistent connections skip the per-request Postgres handshake; health
+    # checks replace connections the server has dropped. Behind pgbouncer
+    # transaction pooling pgbouncer does the pooling, so connections are
+    # closed after each request and neither applies.
+    db_pgbouncer = os.getenv('DB_PGBOUNCER', 'False') == 'True'
     DATABASES = {
-        'default': dj_database_url.config(default=DATABASE_URL, conn_max_age=600)
+        'default': dj_database_url.config(
+            default=DATABASE_URL,
+            conn_max_age=0 if db_pgbouncer else int(os.getenv('DB_CONN_MAX_AGE', '600')),
+            conn_health_checks=not db_pgbouncer,
+        )
     }
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+        # Fail fast instead of hanging a worker when Postgres is unreachable
+        DATABASES['default'].setdefault('OPTIONS', {})['connect_timeout'] = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+        # pgbouncer transaction pooling cannot keep server-side cursors
+        # open across statements
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = db_pgbouncer
+        # Optional psycopg 3 connection pool shared by a worker's threads;
+        # it replaces persistent connections, so CONN_MAX_AGE must be 0
+        pool_max_size = int(os.getenv('DB_POOL_MAX_SIZE', '0'))
+        if pool_max_size:
+            DATABASES['default']['OPTIONS']['pool'] = {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+                'max_size': pool_max_size,
+            }
+            DATABASES['default']['CONN_MAX_AGE'] = 0
 else:
     DATABASES = {
         'default': {
@@ -116,6 +142,10 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 # Media files (Uploaded files)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.getenv('RAILWAY_VOLUME_MOUNT_PATH', str(BASE_DIR / 'media'))
+# When set (e.g. '/protected/'), backup downloads are handed to nginx with
+# X-Accel-Redirect to <prefix><file name>; that location must be
+# 'internal' and alias MEDIA_ROOT. Empty streams the file from Django.
+BACKUP_ACCEL_REDIRECT_PREFIX = os.getenv('BACKUP_ACCEL_REDIRECT_PREFIX', '')
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -136,5 +166,9 @@ MESSAGE_TAGS = {
 }
 
 # License API settings
+# License code format for newly issued codes: 1 = legacy envelope (understood by
+# all app versions), 2 = compact "payload.signature" format (~40% shorter).
+# Validation accepts both.
+LICENSE_CODE_VERSION = int(os.getenv('LICENSE_CODE_VERSION', '1'))
 LICENSE_ADMIN_KEY = os.getenv('LICENSE_ADMIN_KEY', 'retailease-admin-secret')
 RETAILEASE_WEBSITE_API_KEY = os.getenv('RETAILEASE_WEBSITE_API_KEY', 'retailease-website-secret')
@@ -146,8 +146,9 @@ class ClientAdmin(admin.ModelAdmin):
                         renewal_note = f"\n[{timezone.now().isoformat()}] Renewed via admin from {old_instance.valid_until.date()} to {instance.valid_until.date()}"
                         instance.notes = (instance.notes or '') + renewal_note
 
-                        # Regenerate license code with new expiry
-                        instance.license_code = instance.generate_license_code()
+                        # Regenerate license code with new expiry (signed
+                        # by License.save() after commit)
+                        instance.license_code = ''
 
                 instance.save()
 
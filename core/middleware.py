@@ -0,0 +1,56 @@
+import logging
+
+from .models import ActivityLog
+
+logger = logging.getLogger(__name__)
+
+
+class ClientIPMiddleware:
+    """
+    Resolve the client IP once per request (first X-Forwarded-For hop,
+    else REMOTE_ADDR) and store it as request.client_ip.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+        if x_forwarded_for:
+            request.client_ip = x_forwarded_for.partition(',')[0].strip()
+        else:
+            request.client_ip = request.META.get('REMOTE_ADDR')
+        return self.get_response(request)
+
+
+class ActivityLogBufferMiddleware:
+    """
+    Collect ActivityLog entries recorded by log_activity() during a request
+    and write them with a single bulk INSERT once the response is ready.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._activity_buf = []
+        try:
+            return self.get_response(request)
+        finally:
+            # Also runs when the response is an error or an exception escapes
+            self.flush(request)
+
+    @staticmethod
+    def flush(request):
+        buffer = getattr(request, '_activity_buf', None)
+        if not buffer:
+            return
+        request._activity_buf = []
+        try:
+            ActivityLog.objects.bulk_create(buffer, batch_size=500, ignore_conflicts=True)
+        except Exception:
+            # Don't fail the request, but leave a trace of the lost entries
+            logger.exception(
+                'Writing %d activity log entries failed: %s', len(buffer),
+                ', '.join(f'{e.action} {e.model_name} {e.object_id}' for e in buffer)
+            )
@@ -1,4 +1,5 @@
 import uuid
+from django.core.cache import cache
 from django.db import models
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -490,6 +491,13 @@ class Payment(models.Model):
         self.invoice.update_payment_status()
 
 
+# CompanySettings changes rarely; signals drop the cached copy on save, but
+# only in the saving worker (the cache is per-process), so other workers
+# may serve the old settings for up to SETTINGS_CACHE_TTL seconds
+SETTINGS_CACHE_KEY = 'core:company_settings'
+SETTINGS_CACHE_TTL = 5
+
+
 class CompanySettings(models.Model):
     """Singleton model for company settings"""
     company_name = models.CharField(max_length=255, default='Ralfiz Technologies')
@@ -589,6 +597,23 @@ class CompanySettings(models.Model):
         obj, created = cls.objects.get_or_create(pk=1)
         return obj
 
+    @classmethod
+    def get_cached_settings(cls):
+        """
+        Read-only copy of the settings for hot paths (template context,
+        public app config), cached for SETTINGS_CACHE_TTL seconds. Use
+        get_settings() for anything that edits and saves them.
+        """
+        obj = cache.get(SETTINGS_CACHE_KEY)
+        if obj is None:
+            obj = cls.get_settings()
+            cache.set(SETTINGS_CACHE_KEY, obj, SETTINGS_CACHE_TTL)
+        return obj
+
+    @staticmethod
+    def forget_cached_settings():
+        cache.delete(SETTINGS_CACHE_KEY)
+
 
 class Expense(models.Model):
     """Expense tracking model"""
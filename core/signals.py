@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CompanySettings
+
+
+@receiver(post_save, sender=CompanySettings)
+@receiver(post_delete, sender=CompanySettings)
+def company_settings_changed(sender, instance, **kwargs):
+    CompanySettings.forget_cached_settings()
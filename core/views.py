@@ -1,3 +1,5 @@
+import logging
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, logout, authenticate
@@ -15,6 +17,8 @@ from .models import (
 from django.contrib.contenttypes.models import ContentType
 from licensing.models import License, LicenseKey, LicenseActivation
 
+logger = logging.getLogger(__name__)
+
 
 # ============== Authentication Views ==============
 
@@ -239,7 +243,7 @@ def client_list(request):
 
 @login_required
 def client_detail(request, pk):
-    from retailease.models import Backup, Business
+    from retailease.models import Backup
 
     client = get_object_or_404(Client, pk=pk)
     projects = client.projects.all()
@@ -250,10 +254,14 @@ def client_detail(request, pk):
     # Get payments through invoices
     payments = Payment.objects.filter(invoice__client=client).order_by('-payment_date')
 
-    # Get backups through: Client -> Licenses -> Businesses -> Backups
-    license_ids = licenses.values_list('id', flat=True)
-    businesses = Business.objects.filter(license_id__in=license_ids)
-    backups = Backup.objects.filter(business__in=businesses).select_related('business', 'counter').order_by('-created_at')
+    # Get backups through: Client -> Licenses -> Businesses -> Backups,
+    # loading only the columns the backups table shows
+    backups = Backup.objects.filter(business__license__client=client).select_related(
+        'business', 'counter'
+    ).only(
+        'filename', 'checksum', 'file_size', 'backup_type', 'status', 'created_at',
+        'business__name', 'counter__name',
+    ).order_by('-created_at')
 
     context = {
         'client': client,
@@ -3571,26 +3579,31 @@ def send_quote_email(request, pk):
 # ============== Helper Functions ==============
 
 def log_activity(request, action, instance):
-    """Log an activity"""
+    """
+    Log an activity.
+    Entries are buffered on the request and bulk-inserted by
+    ActivityLogBufferMiddleware; without the middleware they are saved directly.
+    """
     try:
-        ActivityLog.objects.create(
+        entry = ActivityLog(
             user=request.user if request.user.is_authenticated else None,
             action=action,
             model_name=instance.__class__.__name__,
             object_id=str(instance.pk),
             object_repr=str(instance)[:255],
-            ip_address=get_client_ip(request),
+            ip_address=request.client_ip,
         )
+        buffer = getattr(request, '_activity_buf', None)
+        if buffer is not None:
+            buffer.append(entry)
+        else:
+            entry.save()
     except Exception:
-        pass  # Don't fail if logging fails
-
-
-def get_client_ip(request):
-    """Get client IP address from request"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        return x_forwarded_for.split(',')[0].strip()
-    return request.META.get('REMOTE_ADDR')
+        # Don't fail the request, but leave a trace of the lost entry
+        logger.exception(
+            'Recording activity %s on %s %s failed',
+            action, type(instance).__name__, getattr(instance, 'pk', None)
+        )
 
 
 # ============== License Management Views ==============
@@ -3712,13 +3725,10 @@ def license_deactivate_device(request, pk, activation_id):
 
     if request.method == 'POST':
         # Deactivate the activation
+        # Activation count is recounted by the LicenseActivation signal
         activation.is_active = False
         activation.save()
 
-        # Update the license activation count
-        license.current_activations = license.activations.filter(is_active=True).count()
-        license.save(update_fields=['current_activations'])
-
         messages.success(request, f'Device "{activation.machine_name or "Unknown Device"}" has been deactivated.')
         return redirect('license_detail', pk=pk)
 
@@ -3733,12 +3743,9 @@ def license_delete_activation(request, pk, activation_id):
 
     if request.method == 'POST':
         device_name = activation.machine_name or "Unknown Device"
+        # Activation count is recounted by the LicenseActivation signal
         activation.delete()
 
-        # Update the license activation count
-        license.current_activations = license.activations.filter(is_active=True).count()
-        license.save(update_fields=['current_activations'])
-
         messages.success(request, f'Device "{device_name}" has been removed.')
         return redirect('license_detail', pk=pk)
 
@@ -3792,9 +3799,10 @@ def license_update(request, pk):
         except (ValueError, TypeError):
             pass
 
-        # Regenerate license code if validity changed
+        # Regenerate license code if validity changed (signed by
+        # License.save() after commit)
         if license.valid_until != old_valid_until:
-            license.license_code = license.generate_license_code()
+            license.license_code = ''
 
         license.save()
         messages.success(request, 'License updated successfully!')
@@ -3877,6 +3885,8 @@ def license_revoke(request, pk):
         
         # Deactivate all activations
         license.activations.update(is_active=False)
+        License.recount_activations(License.objects.filter(pk=license.pk))
+        License.forget_refresh_responses([license.pk])
         
         messages.success(request, f'License {license.license_code} has been revoked.')
         return redirect('license_list')
@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
-from .models import LicenseKey, License, LicenseActivation
+from django.db.models.functions import Substr
+from .models import LicenseKey, KeyGenerationJob, License, LicenseActivation
+from .tasks import generate_key_pair_task
 
 
 @admin.register(LicenseKey)
@@ -36,11 +38,39 @@ class LicenseKeyAdmin(admin.ModelAdmin):
     actions = ['generate_new_keypair']
     
     def generate_new_keypair(self, request, queryset):
-        key_pair = LicenseKey.generate_key_pair()
-        self.message_user(request, f'Generated new key pair: {key_pair.name} (ID: {key_pair.id})')
+        job = generate_key_pair_task()
+        self.message_user(
+            request,
+            f'Key pair generation started (Job ID: {job.id}). '
+            f'Check "Key Generation Jobs" for its status.'
+        )
     generate_new_keypair.short_description = 'Generate new RSA key pair'
 
 
+@admin.register(KeyGenerationJob)
+class KeyGenerationJobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'key_size', 'status_badge', 'key_pair', 'created_at', 'completed_at']
+    list_filter = ['status']
+    readonly_fields = ['id', 'name', 'key_size', 'status', 'key_pair', 'error_message', 'created_at', 'completed_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def status_badge(self, obj):
+        colors = {
+            'pending': '#6c757d',
+            'running': '#ffc107',
+            'completed': '#28a745',
+            'failed': '#dc3545',
+        }
+        color = colors.get(obj.status, '#6c757d')
+        return format_html(
+            '<span style="background-color: {}; color: white; padding: 3px 10px; border-radius: 3px;">{}</span>',
+            color, obj.get_status_display()
+        )
+    status_badge.short_description = 'Status'
+
+
 class LicenseActivationInline(admin.TabularInline):
     model = LicenseActivation
     extra = 0
@@ -174,36 +204,46 @@ class LicenseAdmin(admin.ModelAdmin):
     license_code_display.short_description = 'License Code'
     
     def save_model(self, request, obj, form, change):
-        # Regenerate license code if key fields changed
+        # Regenerate license code if key fields changed (cleared codes are
+        # signed by License.save() once the admin transaction commits)
         if change:
             old_obj = License.objects.filter(pk=obj.pk).first()
             if old_obj:
                 fields_to_check = ['license_type', 'valid_from', 'valid_until', 'max_activations']
                 for field in fields_to_check:
                     if getattr(old_obj, field) != getattr(obj, field):
-                        obj.license_code = obj.generate_license_code()
+                        obj.license_code = ''
                         break
         super().save_model(request, obj, form, change)
     
-    actions = ['mark_expired', 'mark_revoked', 'regenerate_codes']
+    actions = ['mark_expired', 'mark_revoked', 'regenerate_codes', 'recount_activations']
     
     def mark_expired(self, request, queryset):
+        License.forget_validated_codes(queryset.values_list('license_code', flat=True))
+        License.forget_refresh_responses(queryset.values_list('pk', flat=True))
         queryset.update(status='expired')
         self.message_user(request, f'{queryset.count()} licenses marked as expired.')
     mark_expired.short_description = 'Mark selected as expired'
     
     def mark_revoked(self, request, queryset):
+        License.forget_validated_codes(queryset.values_list('license_code', flat=True))
+        License.forget_refresh_responses(queryset.values_list('pk', flat=True))
         queryset.update(status='revoked')
         self.message_user(request, f'{queryset.count()} licenses revoked.')
     mark_revoked.short_description = 'Revoke selected licenses'
     
     def regenerate_codes(self, request, queryset):
         for license in queryset:
-            license.license_code = license.generate_license_code()
+            license.license_code = ''
             license.save()
         self.message_user(request, f'{queryset.count()} license codes regenerated.')
     regenerate_codes.short_description = 'Regenerate license codes'
 
+    def recount_activations(self, request, queryset):
+        updated = License.recount_activations(queryset)
+        self.message_user(request, f'Activation counts recalculated for {updated} licenses.')
+    recount_activations.short_description = 'Recount active activations'
+
 
 @admin.register(LicenseActivation)
 class LicenseActivationAdmin(admin.ModelAdmin):
@@ -212,6 +252,11 @@ class LicenseActivationAdmin(admin.ModelAdmin):
     search_fields = ['license__customer_name', 'machine_id', 'machine_name']
     readonly_fields = ['license', 'machine_id', 'activated_at', 'last_check', 'ip_address']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('license').annotate(
+            _machine_id_short=Substr('machine_id', 1, 16)
+        )
+    
     def machine_id_short(self, obj):
-        return f'{obj.machine_id[:16]}...'
+        return f'{obj._machine_id_short}...'
     machine_id_short.short_description = 'Machine ID'
@@ -1,7 +1,47 @@
+import logging
+import platform
+
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+
 
 class LicensingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'licensing'
     verbose_name = 'License Management'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        self.check_crypto_acceleration()
+
+    @staticmethod
+    def check_crypto_acceleration():
+        """Log the OpenSSL build and warn if the CPU lacks AES-NI/SHA-NI"""
+        try:
+            from cryptography.hazmat.backends.openssl.backend import backend
+            logger.info('Licensing crypto: %s', backend.openssl_version_text())
+        except Exception:
+            logger.warning('Licensing crypto: could not determine OpenSSL version')
+            return
+
+        if platform.machine() not in ('x86_64', 'AMD64'):
+            return
+        try:
+            with open('/proc/cpuinfo') as f:
+                for line in f:
+                    if line.startswith('flags'):
+                        flags = set(line.split(':', 1)[1].split())
+                        break
+                else:
+                    return
+        except OSError:
+            return
+
+        missing = [name for flag, name in (('aes', 'AES-NI'), ('sha_ni', 'SHA-NI')) if flag not in flags]
+        if missing:
+            logger.warning(
+                'Licensing crypto: CPU does not expose %s; license signing and '
+                'checksums will run without hardware acceleration',
+                ', '.join(missing),
+            )
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from licensing.models import License
+
+
+class Command(BaseCommand):
+    help = 'Mark active licenses whose grace period has ended as expired, including ones no client has checked'
+
+    def handle(self, *args, **options):
+        expired = License.expire_lapsed()
+        self.stdout.write(self.style.SUCCESS(f'{expired} licenses marked as expired.'))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:21
+
+from django.db import migrations, models
+
+
+def populate_license_checksum(apps, schema_editor):
+    License = apps.get_model('licensing', 'License')
+    licenses = []
+    for license in License.objects.filter(license_code__startswith='REP-').only('id', 'license_code'):
+        parts = license.license_code.split('-', 2)
+        if len(parts) >= 3:
+            license.license_checksum = parts[1]
+            licenses.append(license)
+    License.objects.bulk_update(licenses, ['license_checksum'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licensing', '0003_add_subscription_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='license',
+            name='license_checksum',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Checksum prefix of the license code (for fast lookups)', max_length=8),
+        ),
+        migrations.RunPython(populate_license_checksum, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:22
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licensing', '0004_license_checksum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeyGenerationJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(default='RetailEase Pro', max_length=100)),
+                ('key_size', models.PositiveIntegerField(default=4096)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('key_pair', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generation_jobs', to='licensing.licensekey')),
+            ],
+            options={
+                'verbose_name': 'Key Generation Job',
+                'verbose_name_plural': 'Key Generation Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licensing', '0005_keygenerationjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='license',
+            index=models.Index(fields=['status', 'valid_until'], name='license_status_until_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='license',
+            index=models.Index(fields=['customer_email'], name='license_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='license',
+            index=models.Index(fields=['client', 'status'], name='license_client_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='licenseactivation',
+            index=models.Index(fields=['license', 'is_active'], name='licact_license_active_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:28
+
+from django.db import migrations, models
+
+
+def populate_valid_until_epoch(apps, schema_editor):
+    License = apps.get_model('licensing', 'License')
+    licenses = []
+    for license in License.objects.only('id', 'valid_until'):
+        license.valid_until_epoch = int(license.valid_until.timestamp())
+        licenses.append(license)
+    License.objects.bulk_update(licenses, ['valid_until_epoch'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licensing', '0006_add_license_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='license',
+            name='valid_until_epoch',
+            field=models.BigIntegerField(blank=True, db_index=True, editable=False, help_text='valid_until as a Unix timestamp (for integer comparisons)', null=True),
+        ),
+        migrations.RunPython(populate_valid_until_epoch, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:29
+
+from cryptography.hazmat.primitives import serialization
+from django.db import migrations, models
+
+
+def populate_key_der(apps, schema_editor):
+    LicenseKey = apps.get_model('licensing', 'LicenseKey')
+    for key in LicenseKey.objects.all():
+        key.private_key_der = serialization.load_pem_private_key(
+            key.private_key.encode('utf-8'), password=None
+        ).private_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        key.public_key_der = serialization.load_pem_public_key(
+            key.public_key.encode('utf-8')
+        ).public_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        key.save(update_fields=['private_key_der', 'public_key_der'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licensing', '0007_license_valid_until_epoch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='licensekey',
+            name='private_key_der',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='licensekey',
+            name='public_key_der',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(populate_key_der, migrations.RunPython.noop),
+    ]
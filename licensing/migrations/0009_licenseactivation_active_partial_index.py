@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licensing', '0008_licensekey_der'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='licenseactivation',
+            name='licact_license_active_idx',
+        ),
+        migrations.AddIndex(
+            model_name='licenseactivation',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['license'], name='licact_active_partial'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licensing', '0009_licenseactivation_active_partial_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='licensekey',
+            index=models.Index(fields=['is_active'], name='licensekey_active_idx'),
+        ),
+    ]
@@ -1,14 +1,64 @@
 import uuid
-import json
+import time
 import base64
+import binascii
 import hashlib
-from datetime import datetime, timedelta
-from django.db import models
+import threading
+from datetime import timedelta
+from cachetools import TLRUCache, TTLCache
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Case, Count, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Now
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from cryptography.exceptions import InvalidSignature
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.backends import default_backend
 
+from .utils import json_dumps, json_loads
+
+# Shared crypto configuration objects (stateless, safe to reuse across calls)
+_BACKEND = default_backend()
+_SHA256 = hashes.SHA256()
+_PSS = padding.PSS(mgf=padding.MGF1(_SHA256), salt_length=padding.PSS.MAX_LENGTH)
+
+# The active key changes only on rotation; signals drop the entry
+ACTIVE_KEY_CACHE_KEY = 'licensing:active_key'
+ACTIVE_PUBLIC_KEY_CACHE_TTL = 3600
+
+# Recently verified license codes, so repeated heartbeats skip the RSA verify.
+# Entries expire after 5 minutes or when the license itself expires, and are
+# only used while the same public key is active.
+VALIDATION_CACHE_TTL = 300
+_validation_cache = TLRUCache(
+    maxsize=10_000,
+    ttu=lambda key, value, now: now + min(VALIDATION_CACHE_TTL, value[1] - time.time()),
+)
+# Codes that failed decoding, signature or expiry checks; those results
+# cannot change for the same code, so repeats skip the RSA verify too
+_rejected_codes = TTLCache(maxsize=10_000, ttl=VALIDATION_CACHE_TTL)
+_validation_cache_lock = threading.Lock()
+
+# refresh_license keeps each license's recent successful responses briefly,
+# keyed by machine; signals drop the entry when the license changes, and a
+# hit re-checks the license status and activation
+REFRESH_CACHE_TTL = 30
+
+
+def _validation_cache_key(license_code):
+    return hashlib.blake2b(license_code.encode('utf-8'), digest_size=16).digest()
+
+
+def _b64url_encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64url_decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
 
 class LicenseKey(models.Model):
     """Model to store RSA key pairs for license signing"""
@@ -17,16 +67,59 @@ class LicenseKey(models.Model):
     name = models.CharField(max_length=100, default="RetailEase Pro")
     private_key = models.TextField(help_text="PEM encoded private key (keep secret!)")
     public_key = models.TextField(help_text="PEM encoded public key (embed in app)")
+    # DER copies of the keys above, derived on save (faster to load than PEM)
+    private_key_der = models.BinaryField(null=True, blank=True, editable=False)
+    public_key_der = models.BinaryField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     
     class Meta:
         verbose_name = "License Key Pair"
         verbose_name_plural = "License Key Pairs"
+        indexes = [
+            models.Index(fields=['is_active'], name='licensekey_active_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {'Active' if self.is_active else 'Inactive'}"
     
+    def save(self, *args, **kwargs):
+        # Keep the DER copies in sync with the (editable) PEM keys
+        self.private_key_der, self.public_key_der = self.pem_to_der(self.private_key, self.public_key)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'private_key' in update_fields:
+                update_fields.add('private_key_der')
+            if 'public_key' in update_fields:
+                update_fields.add('public_key_der')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def pem_to_der(private_pem, public_pem):
+        """Convert PEM private/public keys to (PKCS8 DER, SubjectPublicKeyInfo DER)"""
+        private_der = public_der = None
+        if private_pem:
+            private_der = serialization.load_pem_private_key(
+                private_pem.encode('utf-8'),
+                password=None,
+                backend=_BACKEND
+            ).private_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            )
+        if public_pem:
+            public_der = serialization.load_pem_public_key(
+                public_pem.encode('utf-8'),
+                backend=_BACKEND
+            ).public_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo
+            )
+        return private_der, public_der
+    
     @classmethod
     def generate_key_pair(cls, name="RetailEase Pro", key_size=4096):
         """Generate a new RSA key pair"""
@@ -34,7 +127,7 @@ class LicenseKey(models.Model):
         private_key = rsa.generate_private_key(
             public_exponent=65537,
             key_size=key_size,
-            backend=default_backend()
+            backend=_BACKEND
         )
         
         # Serialize private key
@@ -57,22 +150,88 @@ class LicenseKey(models.Model):
             is_active=True
         )
     
+    @classmethod
+    def get_active_key(cls):
+        """Return (id, PEM public key) of the active key pair (cached), or None"""
+        active_key = cache.get(ACTIVE_KEY_CACHE_KEY)
+        if active_key is None:
+            active_key = cls.objects.filter(is_active=True).values_list('id', 'public_key').first()
+            if active_key is not None:
+                active_key = (str(active_key[0]), active_key[1])
+                cache.set(ACTIVE_KEY_CACHE_KEY, active_key, ACTIVE_PUBLIC_KEY_CACHE_TTL)
+        return active_key
+
+    @classmethod
+    def get_active_public_key(cls):
+        """Return the active key pair's PEM public key (cached), or None"""
+        active_key = cls.get_active_key()
+        return active_key[1] if active_key else None
+
+    @staticmethod
+    def forget_active_key():
+        """Drop the cached active key (call when key pairs change)"""
+        cache.delete(ACTIVE_KEY_CACHE_KEY)
+    
     def get_private_key(self):
         """Load and return the private key object"""
+        if self.private_key_der:
+            return serialization.load_der_private_key(
+                bytes(self.private_key_der),
+                password=None,
+                backend=_BACKEND
+            )
         return serialization.load_pem_private_key(
             self.private_key.encode('utf-8'),
             password=None,
-            backend=default_backend()
+            backend=_BACKEND
         )
     
     def get_public_key(self):
         """Load and return the public key object"""
+        if self.public_key_der:
+            return serialization.load_der_public_key(
+                bytes(self.public_key_der),
+                backend=_BACKEND
+            )
         return serialization.load_pem_public_key(
             self.public_key.encode('utf-8'),
-            backend=default_backend()
+            backend=_BACKEND
         )
 
 
+class KeyGenerationJob(models.Model):
+    """Tracks an RSA key pair generation running in the background"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=100, default="RetailEase Pro")
+    key_size = models.PositiveIntegerField(default=4096)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    key_pair = models.ForeignKey(
+        LicenseKey,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='generation_jobs'
+    )
+    error_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Key Generation Job"
+        verbose_name_plural = "Key Generation Jobs"
+
+    def __str__(self):
+        return f"{self.name} ({self.key_size}-bit) - {self.get_status_display()}"
+
+
 class License(models.Model):
     """Model to store issued licenses"""
 
@@ -126,6 +285,10 @@ class License(models.Model):
     issued_at = models.DateTimeField(auto_now_add=True)
     valid_from = models.DateTimeField(default=timezone.now)
     valid_until = models.DateTimeField()
+    valid_until_epoch = models.BigIntegerField(
+        null=True, blank=True, db_index=True, editable=False,
+        help_text="valid_until as a Unix timestamp (for integer comparisons)"
+    )
 
     # Subscription & Billing
     billing_cycle = models.CharField(max_length=20, choices=BILLING_CYCLE_CHOICES, default='yearly')
@@ -139,6 +302,10 @@ class License(models.Model):
 
     # The actual license key (signed data)
     license_code = models.TextField(blank=True, help_text="The signed license code to give to customer")
+    license_checksum = models.CharField(
+        max_length=8, blank=True, db_index=True, editable=False,
+        help_text="Checksum prefix of the license code (for fast lookups)"
+    )
 
     # Metadata
     notes = models.TextField(blank=True)
@@ -149,9 +316,21 @@ class License(models.Model):
         ordering = ['-created_at']
         verbose_name = "License"
         verbose_name_plural = "Licenses"
+        indexes = [
+            models.Index(fields=['status', 'valid_until'], name='license_status_until_idx'),
+            models.Index(fields=['customer_email'], name='license_email_idx'),
+            models.Index(fields=['client', 'status'], name='license_client_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.customer_name} - {self.license_type} ({self.status})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded code so signals can evict it once replaced
+        instance._loaded_license_code = instance.__dict__.get('license_code')
+        return instance
     
     def save(self, *args, **kwargs):
         # Auto-set valid_until based on license type if not set
@@ -163,42 +342,136 @@ class License(models.Model):
             else:
                 self.valid_until = timezone.now() + timedelta(days=365)  # 1 year
         
-        # Generate license code if not present
-        if not self.license_code:
-            self.license_code = self.generate_license_code()
-        
+        # Keep the indexed checksum and expiry epoch in sync
+        self.license_checksum = self.get_code_checksum(self.license_code)
+        self.valid_until_epoch = int(self.valid_until.timestamp())
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'license_code' in update_fields:
+                update_fields.add('license_checksum')
+            if 'valid_until' in update_fields:
+                update_fields.add('valid_until_epoch')
+            kwargs['update_fields'] = update_fields
+
         super().save(*args, **kwargs)
+
+        # Sign the license code after commit so the RSA work stays out of
+        # the saving transaction; clear license_code to request a new one
+        if not self.license_code:
+            transaction.on_commit(self.populate_license_code, using=self._state.db)
+
+    def populate_license_code(self):
+        """Sign and store a license code if the row still has none"""
+        license_code = self.generate_license_code()
+        license_checksum = self.get_code_checksum(license_code)
+        updated = License.objects.filter(pk=self.pk, license_code='').update(
+            license_code=license_code,
+            license_checksum=license_checksum,
+        )
+        if updated:
+            self.license_code = license_code
+            self.license_checksum = license_checksum
+            self._loaded_license_code = license_code
+
+    @staticmethod
+    def forget_validated_codes(license_codes):
+        """Drop license codes from the validate_license_code result caches"""
+        with _validation_cache_lock:
+            for license_code in license_codes:
+                if license_code:
+                    cache_key = _validation_cache_key(license_code)
+                    _validation_cache.pop(cache_key, None)
+                    _rejected_codes.pop(cache_key, None)
+
+    @staticmethod
+    def refresh_cache_key(license_id):
+        # Normalise so 'ABCD...' and UUID('abcd...') share one entry
+        return f'licensing:refresh:{uuid.UUID(str(license_id))}'
+
+    @classmethod
+    def forget_refresh_responses(cls, license_ids):
+        """Drop cached refresh_license responses for these licenses"""
+        cache.delete_many([cls.refresh_cache_key(license_id) for license_id in license_ids])
+
+    @classmethod
+    def recount_activations(cls, queryset=None):
+        """
+        Recompute current_activations from active LicenseActivation rows
+        using a single UPDATE with a correlated subquery.
+        Returns the number of licenses updated.
+        """
+        active_count = LicenseActivation.objects.filter(
+            license=OuterRef('pk'), is_active=True
+        ).order_by().values('license').annotate(c=Count('*')).values('c')
+        if queryset is None:
+            queryset = cls.objects.all()
+        return queryset.update(current_activations=Coalesce(Subquery(active_count), 0))
+
+    @classmethod
+    def expire_lapsed(cls):
+        """
+        Mark active licenses whose grace period has ended as expired.
+        Runs one UPDATE per distinct grace_period_days value.
+        Returns the number of licenses updated.
+        """
+        now = timezone.now()
+        active = cls.objects.filter(status='active', valid_until__lt=now)
+        expired = 0
+        grace_periods = active.order_by().values_list('grace_period_days', flat=True).distinct()
+        for grace_days in list(grace_periods):
+            expired += active.filter(
+                grace_period_days=grace_days,
+                valid_until__lt=now - timedelta(days=grace_days),
+            ).update(status='expired', updated_at=now)
+        return expired
+
+    @staticmethod
+    def get_code_checksum(license_code):
+        """Return the checksum prefix of a 'REP-XXXXXXXX-...' license code"""
+        if license_code and license_code.startswith('REP-'):
+            parts = license_code.split('-', 2)
+            if len(parts) >= 3:
+                return parts[1]
+        return ''
     
     def generate_license_code(self):
         """Generate a cryptographically signed license code"""
         # Create license payload
-        payload = {
+        return self.sign_payload({
             'lid': str(self.id),  # License ID
             'cname': self.customer_name,
             'cemail': self.customer_email,
             'ltype': self.license_type,
             'vfrom': self.valid_from.isoformat(),
             'vuntil': self.valid_until.isoformat(),
+            'vuntil_epoch': int(self.valid_until.timestamp()),
             'maxact': self.max_activations,
             'iat': timezone.now().isoformat(),  # Issued at
-        }
-        
-        # Convert payload to JSON and encode
-        payload_json = json.dumps(payload, separators=(',', ':'), sort_keys=True)
-        payload_bytes = payload_json.encode('utf-8')
+        }, self.key_pair)
+
+    @staticmethod
+    def sign_payload(payload, key_pair):
+        """Sign a license payload with key_pair and return the license code"""
+        # Convert payload to JSON and encode (the signature covers these
+        # exact bytes, so key order does not need to be canonical)
+        payload_bytes = json_dumps(payload)
         
         # Sign the payload with RSA private key
-        private_key = self.key_pair.get_private_key()
+        private_key = key_pair.get_private_key()
         signature = private_key.sign(
             payload_bytes,
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
+            _PSS,
+            _SHA256
         )
         
-        # Combine payload and signature
+        if getattr(settings, 'LICENSE_CODE_VERSION', 1) >= 2:
+            # v2: "<payload>.<signature>.2" with unpadded URL-safe base64
+            license_code = '.'.join([_b64url_encode(payload_bytes), _b64url_encode(signature), '2'])
+            checksum = hashlib.sha256(license_code.encode()).hexdigest()[:8].upper()
+            return f"REP-{checksum}-{license_code}"
+
+        # v1: base64 of a JSON envelope holding base64 payload and signature
         license_data = {
             'p': base64.b64encode(payload_bytes).decode('utf-8'),  # payload
             's': base64.b64encode(signature).decode('utf-8'),      # signature
@@ -206,8 +479,7 @@ class License(models.Model):
         }
         
         # Encode to base64 for easy transport
-        license_json = json.dumps(license_data, separators=(',', ':'))
-        license_code = base64.b64encode(license_json.encode('utf-8')).decode('utf-8')
+        license_code = base64.b64encode(json_dumps(license_data)).decode('utf-8')
         
         # Format as readable chunks (5 chars separated by dash)
         # First add a checksum prefix
@@ -223,6 +495,26 @@ class License(models.Model):
             self.valid_from <= now <= self.valid_until
         )
     
+    @staticmethod
+    def is_valid_expression(prefix=''):
+        """
+        Database-side equivalent of is_valid() for annotate()/filter().
+        prefix is the relation path to the license, e.g. 'license__'.
+        """
+        now = Now()
+        return Case(
+            When(
+                Q(**{
+                    f'{prefix}status': 'active',
+                    f'{prefix}valid_from__lte': now,
+                    f'{prefix}valid_until__gte': now,
+                }),
+                then=Value(True),
+            ),
+            default=Value(False),
+            output_field=models.BooleanField(),
+        )
+    
     def days_remaining(self):
         """Get days remaining on license"""
         if not self.is_valid():
@@ -268,8 +560,9 @@ class License(models.Model):
         self.renewal_count += 1
         self.status = 'active'
 
-        # Regenerate license code with new expiry
-        self.license_code = self.generate_license_code()
+        # Regenerate license code with new expiry (signed by save() after
+        # commit)
+        self.license_code = ''
         self.save()
 
         return new_valid_until
@@ -280,62 +573,88 @@ class License(models.Model):
         Validate a license code using the public key.
         Returns (is_valid, payload_or_error)
         """
+        cache_key = _validation_cache_key(license_code)
         try:
-            # Remove prefix if present
-            if license_code.startswith('REP-'):
-                parts = license_code.split('-', 2)
-                if len(parts) >= 3:
-                    license_code = parts[2]
-            
-            # Decode base64
-            license_json = base64.b64decode(license_code.encode('utf-8')).decode('utf-8')
-            license_data = json.loads(license_json)
-            
-            # Extract payload and signature
-            payload_bytes = base64.b64decode(license_data['p'])
-            signature = base64.b64decode(license_data['s'])
+            # Replaced and cleared codes are evicted on save, so a hit is
+            # still current
+            with _validation_cache_lock:
+                cached = _validation_cache.get(cache_key)
+                rejected = _rejected_codes.get(cache_key) if cached is None else None
+            # A hit only counts if it was verified against this key
+            if cached is not None and cached[2] == public_key_pem:
+                return True, cached[0]
+            if rejected is not None and rejected[1] == public_key_pem:
+                return False, rejected[0]
+
+            # Remove prefix if present. Only the current checksum is stored,
+            # so codes issued before a renewal are verified by signature
+            if license_code[:4] == 'REP-':
+                _checksum, sep, body = license_code[4:].partition('-')
+                if sep:
+                    license_code = body
             
             # Load public key
             public_key = serialization.load_pem_public_key(
                 public_key_pem.encode('utf-8'),
-                backend=default_backend()
-            )
-            
-            # Verify signature
-            public_key.verify(
-                signature,
-                payload_bytes,
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
+                backend=_BACKEND
             )
             
-            # Signature valid, parse payload
-            payload = json.loads(payload_bytes.decode('utf-8'))
-            
-            # Check expiry
-            valid_until = datetime.fromisoformat(payload['vuntil'])
-            if timezone.is_naive(valid_until):
-                valid_until = timezone.make_aware(valid_until)
+            try:
+                if '.' in license_code:
+                    # v2 compact format
+                    payload_b64, signature_b64, _version = license_code.split('.')
+                    payload_bytes = _b64url_decode(payload_b64)
+                    signature = _b64url_decode(signature_b64)
+                else:
+                    # v1: decode the base64 JSON envelope
+                    license_data = json_loads(binascii.a2b_base64(license_code))
+
+                    # Extract payload and signature
+                    payload_bytes = binascii.a2b_base64(license_data['p'])
+                    signature = binascii.a2b_base64(license_data['s'])
+                
+                # Verify signature
+                public_key.verify(
+                    signature,
+                    payload_bytes,
+                    _PSS,
+                    _SHA256
+                )
+                
+                # Signature valid, parse payload
+                payload = json_loads(payload_bytes)
+            except (ValueError, KeyError, TypeError, InvalidSignature) as e:
+                # Malformed or forged codes fail the same way every time
+                return cls._reject_code(cache_key, public_key_pem, f"Invalid license: {str(e)}")
             
-            if timezone.now() > valid_until:
-                return False, "License has expired"
+            # Check expiry (older codes only carry the ISO timestamp)
+            now = time.time()
+            valid_until_epoch = payload.get('vuntil_epoch')
+            if valid_until_epoch is None:
+                valid_until_epoch = parse_datetime(payload['vuntil']).timestamp()
+            if now > valid_until_epoch:
+                return cls._reject_code(cache_key, public_key_pem, "License has expired")
             
             # Check valid_from
-            valid_from = datetime.fromisoformat(payload['vfrom'])
-            if timezone.is_naive(valid_from):
-                valid_from = timezone.make_aware(valid_from)
-            
-            if timezone.now() < valid_from:
+            valid_from = parse_datetime(payload['vfrom'])
+            if now < valid_from.timestamp():
                 return False, "License is not yet valid"
+
+            with _validation_cache_lock:
+                _validation_cache[cache_key] = (payload, valid_until_epoch, public_key_pem)
             
             return True, payload
             
         except Exception as e:
             return False, f"Invalid license: {str(e)}"
 
+    @staticmethod
+    def _reject_code(cache_key, public_key_pem, error):
+        """Remember a permanent validation failure and return it"""
+        with _validation_cache_lock:
+            _rejected_codes[cache_key] = (error, public_key_pem)
+        return False, error
+
 
 class LicenseActivation(models.Model):
     """Track license activations on different machines"""
@@ -352,6 +671,18 @@ class LicenseActivation(models.Model):
     class Meta:
         unique_together = ['license', 'machine_id']
         ordering = ['-activated_at']
+        # unique_together already indexes (license, machine_id) lookups;
+        # active-count queries only need the active rows
+        indexes = [
+            models.Index(fields=['license'], condition=models.Q(is_active=True), name='licact_active_partial'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded state so signals can tell if is_active changed
+        instance._loaded_is_active = instance.__dict__.get('is_active')
+        return instance
     
     def __str__(self):
         return f"{self.license.customer_name} - {self.machine_id[:16]}..."
@@ -0,0 +1,61 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import License, LicenseActivation, LicenseKey
+
+_pending = threading.local()
+
+
+def _flush_activation_recounts():
+    license_ids = getattr(_pending, 'license_ids', None)
+    if not license_ids:
+        return
+    _pending.license_ids = set()
+    License.recount_activations(License.objects.filter(pk__in=license_ids))
+
+
+def schedule_activation_recount(license_id):
+    """
+    Recount a license's active activations once the current transaction
+    commits. Several changes within one transaction share a single UPDATE.
+    """
+    if getattr(_pending, 'license_ids', None) is None:
+        _pending.license_ids = set()
+    _pending.license_ids.add(license_id)
+    transaction.on_commit(_flush_activation_recounts)
+
+
+@receiver(post_save, sender=LicenseActivation)
+def activation_saved(sender, instance, created, update_fields=None, **kwargs):
+    License.forget_refresh_responses([instance.license_id])
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    if created or instance.is_active != getattr(instance, '_loaded_is_active', None):
+        schedule_activation_recount(instance.license_id)
+    instance._loaded_is_active = instance.is_active
+
+
+@receiver(post_save, sender=License)
+@receiver(post_delete, sender=License)
+def license_saved(sender, instance, **kwargs):
+    # A cleared or changed code must evict the code it replaced, too
+    License.forget_validated_codes([
+        instance.license_code, getattr(instance, '_loaded_license_code', None)
+    ])
+    instance._loaded_license_code = instance.license_code
+    License.forget_refresh_responses([instance.pk])
+
+
+@receiver(post_delete, sender=LicenseActivation)
+def activation_deleted(sender, instance, **kwargs):
+    License.forget_refresh_responses([instance.license_id])
+    schedule_activation_recount(instance.license_id)
+
+
+@receiver(post_save, sender=LicenseKey)
+@receiver(post_delete, sender=LicenseKey)
+def forget_active_key(sender, instance, **kwargs):
+    LicenseKey.forget_active_key()
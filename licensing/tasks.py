@@ -0,0 +1,52 @@
+"""
+Background tasks for the licensing app.
+
+Slow work (like RSA key generation) runs on a small in-process thread pool
+so it never blocks the request that triggered it.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='licensing-task')
+
+
+def _run_key_generation_job(job_id):
+    from .models import KeyGenerationJob, LicenseKey
+
+    close_old_connections()
+    try:
+        updated = KeyGenerationJob.objects.filter(pk=job_id, status='pending').update(status='running')
+        if not updated:
+            return
+        job = KeyGenerationJob.objects.get(pk=job_id)
+        try:
+            key_pair = LicenseKey.generate_key_pair(name=job.name, key_size=job.key_size)
+        except Exception as e:
+            logger.exception('Key generation job %s failed', job_id)
+            KeyGenerationJob.objects.filter(pk=job_id).update(
+                status='failed', error_message=str(e), completed_at=timezone.now()
+            )
+        else:
+            KeyGenerationJob.objects.filter(pk=job_id).update(
+                status='completed', key_pair=key_pair, completed_at=timezone.now()
+            )
+    finally:
+        connections.close_all()
+
+
+def generate_key_pair_task(name="RetailEase Pro", key_size=4096):
+    """
+    Queue generation of a new RSA key pair.
+    Returns the KeyGenerationJob tracking it; the job is picked up once the
+    current transaction commits.
+    """
+    from .models import KeyGenerationJob
+
+    job = KeyGenerationJob.objects.create(name=name, key_size=key_size)
+    transaction.on_commit(lambda: _executor.submit(_run_key_generation_job, job.pk))
+    return job
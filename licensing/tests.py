@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import License, LicenseActivation, LicenseKey
+
+
+class LicenseAPITestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.key_pair = LicenseKey.generate_key_pair(key_size=2048)
+
+    def setUp(self):
+        cache.clear()
+        # Codes are signed once the creating transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.license = License.objects.create(
+                key_pair=self.key_pair,
+                customer_name='Test Customer',
+                customer_email='test@example.com',
+                max_activations=2,
+            )
+        self.license.refresh_from_db()
+
+    def validate(self, machine_id):
+        return self.client.post(
+            '/api/license/validate/',
+            {'license_code': self.license.license_code, 'machine_id': machine_id},
+            content_type='application/json',
+        )
+
+    def refresh(self):
+        return self.client.post(
+            '/api/license/refresh/',
+            {'license_id': str(self.license.id), 'machine_id': 'machine-1'},
+            content_type='application/json',
+        )
+
+
+class ValidateLicenseTests(LicenseAPITestCase):
+    def test_activations_are_capped(self):
+        self.assertEqual(self.validate('machine-1').status_code, 200)
+        self.assertEqual(self.validate('machine-2').status_code, 200)
+
+        response = self.validate('machine-3')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Maximum activations (2) exceeded')
+        self.license.refresh_from_db()
+        self.assertEqual(self.license.current_activations, 2)
+        self.assertFalse(LicenseActivation.objects.filter(machine_id='machine-3').exists())
+
+    def test_returning_machine_reuses_its_activation(self):
+        self.assertEqual(self.validate('machine-1').status_code, 200)
+        self.assertEqual(self.validate('machine-1').status_code, 200)
+
+        self.license.refresh_from_db()
+        self.assertEqual(self.license.current_activations, 1)
+        self.assertEqual(self.license.activations.count(), 1)
+
+    def test_code_issued_before_a_renewal_stays_valid(self):
+        old_code = self.license.license_code
+        with self.captureOnCommitCallbacks(execute=True):
+            self.license.renew(30)
+        self.license.refresh_from_db()
+        self.assertNotEqual(self.license.license_code, old_code)
+
+        response = self.client.post(
+            '/api/license/validate/',
+            {'license_code': old_code, 'machine_id': 'machine-1'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['valid'])
+
+    def test_returning_machine_is_let_in_at_the_cap(self):
+        self.validate('machine-1')
+        self.validate('machine-2')
+
+        self.assertEqual(self.validate('machine-1').status_code, 200)
+
+
+class ExpiryTests(LicenseAPITestCase):
+    def lapse(self, days_ago):
+        License.objects.filter(pk=self.license.pk).update(
+            valid_until=timezone.now() - timedelta(days=days_ago), grace_period_days=7
+        )
+        cache.clear()
+
+    def test_refresh_flags_a_lapsed_license(self):
+        self.validate('machine-1')
+        self.lapse(days_ago=10)
+
+        self.assertEqual(self.refresh().json()['status'], 'expired')
+        self.license.refresh_from_db()
+        self.assertEqual(self.license.status, 'expired')
+
+    def test_refresh_leaves_a_license_in_its_grace_period_active(self):
+        self.validate('machine-1')
+        self.lapse(days_ago=2)
+
+        self.assertTrue(self.refresh().json()['in_grace_period'])
+        self.license.refresh_from_db()
+        self.assertEqual(self.license.status, 'active')
+
+
+class RefreshCacheTests(LicenseAPITestCase):
+    def test_cached_response_is_not_served_after_revocation(self):
+        self.validate('machine-1')
+        self.assertTrue(self.refresh().json()['valid'])
+
+        # As another worker would: the row changes, this cache does not
+        License.objects.filter(pk=self.license.pk).update(status='revoked')
+        response = self.refresh()
+        self.assertFalse(response.json()['valid'])
+        self.assertEqual(response.json()['status'], 'revoked')
+
+    def test_cached_response_is_not_served_after_deactivation(self):
+        self.validate('machine-1')
+        self.assertTrue(self.refresh().json()['valid'])
+
+        LicenseActivation.objects.filter(machine_id='machine-1').update(is_active=False)
+        self.assertEqual(self.refresh().json()['status'], 'device_deactivated')
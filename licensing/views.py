@@ -1,24 +1,122 @@
-import json
-from django.http import JsonResponse
+import hashlib
+import hmac
+import time
+from operator import attrgetter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, TextField, Value
+from django.db.models.functions import Concat
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import parse_etags, quote_etag
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
-from .models import License, LicenseActivation, LicenseKey
+from django.utils.dateparse import parse_datetime
+from .models import ACTIVE_PUBLIC_KEY_CACHE_TTL, REFRESH_CACHE_TTL, License, LicenseActivation, LicenseKey
+from .signals import schedule_activation_recount
+from .utils import OrjsonResponse, json_body, json_dumps
 
 
-def get_client_ip(request):
-    """Get client IP address from request"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
+# License columns validate_license reads (skips the wide text columns)
+VALIDATE_LICENSE_FIELDS = (
+    'id', 'status', 'valid_from', 'valid_until', 'grace_period_days', 'max_activations',
+    'license_type', 'customer_name', 'customer_email',
+)
+
+# License columns check_license reads
+CHECK_LICENSE_FIELDS = (
+    'id', 'status', 'valid_from', 'valid_until', 'grace_period_days',
+    'billing_cycle', 'license_type', 'customer_name', 'customer_email',
+    'renewal_count',
+)
+
+# License columns refresh_license reads
+REFRESH_LICENSE_FIELDS = CHECK_LICENSE_FIELDS + ('last_renewed_at',)
+
+# Minimum seconds between last_check writes for one activation
+HEARTBEAT_WRITE_INTERVAL = 300
+
+# Shared secrets for the admin renewal and website endpoints, read once
+_ADMIN_KEY = getattr(settings, 'LICENSE_ADMIN_KEY', 'retailease-admin-secret').encode('utf-8')
+_WEBSITE_API_KEY = getattr(settings, 'RETAILEASE_WEBSITE_API_KEY', 'retailease-website-secret').encode('utf-8')
+
+
+def _record_heartbeat(activation_id, ip_address):
+    """
+    Write an activation's last_check and ip_address, at most once per
+    HEARTBEAT_WRITE_INTERVAL
+    """
+    try:
+        due = cache.add(f'licensing:heartbeat:{activation_id}', 1, HEARTBEAT_WRITE_INTERVAL)
+    except Exception:
+        # Cache unavailable: fall back to writing every time
+        due = True
+    if due:
+        LicenseActivation.objects.filter(pk=activation_id).update(
+            last_check=timezone.now(), ip_address=ip_address
+        )
+
+
+def _secret_matches(given, expected):
+    """Constant-time comparison of a client-supplied key with an encoded secret"""
+    return hmac.compare_digest(given.encode('utf-8'), expected)
+
+
+def _body_etag(body):
+    return quote_etag(hashlib.sha256(body).hexdigest()[:16])
+
+
+def _conditional_json(request, body, etag):
+    """
+    Serve a JSON body with its ETag. Periodic polls mostly repeat the
+    previous answer, so clients that send back the last ETag get an empty
+    304 instead.
+    """
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
     else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+# How each key of a 'license' response object is read from a License
+_LICENSE_PAYLOAD_GETTERS = {
+    'id': lambda lic: str(lic.id),
+    'type': attrgetter('license_type'),
+    'customer_name': attrgetter('customer_name'),
+    'customer_email': attrgetter('customer_email'),
+    'valid_from': attrgetter('valid_from'),
+    'valid_until': attrgetter('valid_until'),
+    'days_remaining': lambda lic: lic.days_remaining(),
+    'status': attrgetter('status'),
+    'billing_cycle': attrgetter('billing_cycle'),
+    'renewal_count': attrgetter('renewal_count'),
+    'last_renewed_at': attrgetter('last_renewed_at'),
+}
+
+# Keys of the full license object returned by refresh_license
+FULL_LICENSE_PAYLOAD = tuple(_LICENSE_PAYLOAD_GETTERS)
+
+
+def _license_payload(license_obj, keys, **overrides):
+    """Build the 'license' response object with the given keys, in order"""
+    return {
+        key: overrides[key] if key in overrides else _LICENSE_PAYLOAD_GETTERS[key](license_obj)
+        for key in keys
+    }
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def validate_license(request):
+@json_body(required=[
+    ('license_code', 'License code is required'),
+    ('machine_id', 'Machine ID is required'),
+], error_fields={'valid': False})
+def validate_license(request, data):
     """
     Validate a license code.
     
@@ -30,27 +128,14 @@ def validate_license(request):
     }
     """
     try:
-        data = json.loads(request.body)
         license_code = data.get('license_code', '').strip()
         machine_id = data.get('machine_id', '').strip()
         machine_name = data.get('machine_name', '')
         
-        if not license_code:
-            return JsonResponse({
-                'valid': False,
-                'error': 'License code is required'
-            }, status=400)
-        
-        if not machine_id:
-            return JsonResponse({
-                'valid': False,
-                'error': 'Machine ID is required'
-            }, status=400)
-        
-        # Get active key pair
-        key_pair = LicenseKey.objects.filter(is_active=True).first()
-        if not key_pair:
-            return JsonResponse({
+        # Get active public key
+        public_key = LicenseKey.get_active_public_key()
+        if not public_key:
+            return OrjsonResponse({
                 'valid': False,
                 'error': 'License system not configured'
             }, status=500)
@@ -58,106 +143,117 @@ def validate_license(request):
         # Validate the license code cryptographically
         is_valid, result = License.validate_license_code(
             license_code, 
-            key_pair.public_key,
+            public_key,
             machine_id
         )
         
         if not is_valid:
-            return JsonResponse({
+            return OrjsonResponse({
                 'valid': False,
                 'error': result
             }, status=400)
         
-        # License code is valid, now check database record
+        # License code is valid, now check database record. Machines that
+        # are already activated get the license from the same JOINed SELECT.
         license_id = result.get('lid')
         try:
-            license_obj = License.objects.get(id=license_id)
-        except License.DoesNotExist:
-            return JsonResponse({
-                'valid': False,
-                'error': 'License not found in database'
-            }, status=400)
+            activation = LicenseActivation.objects.select_related('license').only(
+                'id', 'is_active', 'license',
+                *(f'license__{field}' for field in VALIDATE_LICENSE_FIELDS)
+            ).get(license_id=license_id, machine_id=machine_id)
+            license_obj = activation.license
+        except LicenseActivation.DoesNotExist:
+            activation = None
+            try:
+                license_obj = License.objects.only(*VALIDATE_LICENSE_FIELDS).get(id=license_id)
+            except License.DoesNotExist:
+                return OrjsonResponse({
+                    'valid': False,
+                    'error': 'License not found in database'
+                }, status=400)
         
         # Check license status
         if license_obj.status == 'revoked':
-            return JsonResponse({
+            return OrjsonResponse({
                 'valid': False,
                 'error': 'License has been revoked'
             }, status=400)
         
         if license_obj.status == 'suspended':
-            return JsonResponse({
+            return OrjsonResponse({
                 'valid': False,
                 'error': 'License has been suspended'
             }, status=400)
         
         if license_obj.status == 'expired' or not license_obj.is_valid():
-            license_obj.status = 'expired'
-            license_obj.save()
-            return JsonResponse({
+            # Flag the lapse once the grace period is over; conditional, so
+            # concurrent requests (and expire_licenses) write it once
+            now = timezone.now()
+            if (license_obj.status == 'active' and now > license_obj.valid_until
+                    and not license_obj.is_in_grace_period()):
+                License.objects.filter(pk=license_obj.pk, status='active').update(
+                    status='expired', updated_at=now
+                )
+            return OrjsonResponse({
                 'valid': False,
                 'error': 'License has expired'
             }, status=400)
         
-        # Check/create activation
-        activation, created = LicenseActivation.objects.get_or_create(
-            license=license_obj,
-            machine_id=machine_id,
-            defaults={
-                'machine_name': machine_name,
-                'ip_address': get_client_ip(request),
-                'is_active': True
-            }
-        )
+        # Create the activation if this machine has none yet
+        created = False
+        if activation is None:
+            try:
+                with transaction.atomic():
+                    # Claim a free slot first; the UPDATE's row lock
+                    # serializes concurrent activations of the same license
+                    claimed = License.objects.filter(
+                        pk=license_obj.pk,
+                        current_activations__lt=F('max_activations')
+                    ).update(current_activations=F('current_activations') + 1)
+                    if not claimed:
+                        return OrjsonResponse({
+                            'valid': False,
+                            'error': f'Maximum activations ({license_obj.max_activations}) exceeded'
+                        }, status=400)
+                    activation = LicenseActivation.objects.create(
+                        license=license_obj,
+                        machine_id=machine_id,
+                        machine_name=machine_name,
+                        ip_address=request.client_ip,
+                        is_active=True
+                    )
+                    created = True
+            except IntegrityError:
+                # Another request activated this machine first
+                activation = LicenseActivation.objects.only('id', 'is_active').get(
+                    license=license_obj,
+                    machine_id=machine_id
+                )
         
-        if created:
-            # New activation
-            active_count = license_obj.activations.filter(is_active=True).count()
-            if active_count > license_obj.max_activations:
-                # Too many activations, deactivate this one
-                activation.is_active = False
-                activation.save()
-                return JsonResponse({
-                    'valid': False,
-                    'error': f'Maximum activations ({license_obj.max_activations}) exceeded'
-                }, status=400)
-            
-            license_obj.current_activations = active_count
-            license_obj.save()
-        else:
+        if not created:
             # Existing activation, update last check
-            activation.last_check = timezone.now()
-            activation.ip_address = get_client_ip(request)
-            if machine_name:
-                activation.machine_name = machine_name
-            activation.save()
+            LicenseActivation.objects.filter(pk=activation.pk).update(
+                last_check=timezone.now(),
+                ip_address=request.client_ip,
+                **({'machine_name': machine_name} if machine_name else {})
+            )
             
             if not activation.is_active:
-                return JsonResponse({
+                return OrjsonResponse({
                     'valid': False,
                     'error': 'This activation has been deactivated'
                 }, status=400)
         
         # Return success with license details
-        return JsonResponse({
+        return OrjsonResponse({
             'valid': True,
-            'license': {
-                'id': str(license_obj.id),
-                'type': license_obj.license_type,
-                'customer_name': license_obj.customer_name,
-                'customer_email': license_obj.customer_email,
-                'valid_until': license_obj.valid_until.isoformat(),
-                'days_remaining': license_obj.days_remaining(),
-            }
+            'license': _license_payload(license_obj, (
+                'id', 'type', 'customer_name', 'customer_email', 'valid_until', 'days_remaining',
+            ))
         })
         
-    except json.JSONDecodeError:
-        return JsonResponse({
-            'valid': False,
-            'error': 'Invalid JSON'
-        }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return OrjsonResponse({
             'valid': False,
             'error': str(e)
         }, status=500)
@@ -165,7 +261,11 @@ def validate_license(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def check_license(request):
+@json_body(required=[
+    ('license_id', 'License ID and Machine ID are required'),
+    ('machine_id', 'License ID and Machine ID are required'),
+], uuid_fields=[('license_id', 'Invalid license ID')], error_fields={'valid': False})
+def check_license(request, data):
     """
     Quick check if a license is still valid (for periodic checks).
     Also returns updated license info if it was renewed on the backend.
@@ -179,63 +279,56 @@ def check_license(request):
     Response includes 'renewed' flag if license was renewed since last check.
     """
     try:
-        data = json.loads(request.body)
         license_id = data.get('license_id', '').strip()
         machine_id = data.get('machine_id', '').strip()
         last_known_expiry = data.get('last_known_expiry', '')  # ISO format
 
-        if not license_id or not machine_id:
-            return JsonResponse({
-                'valid': False,
-                'error': 'License ID and Machine ID are required'
-            }, status=400)
-
+        # Load the active activation and its license in one JOINed SELECT
         try:
-            license_obj = License.objects.get(id=license_id)
-        except License.DoesNotExist:
-            return JsonResponse({
-                'valid': False,
-                'error': 'License not found'
-            }, status=400)
-
-        # Check activation
-        try:
-            activation = LicenseActivation.objects.get(
-                license=license_obj,
-                machine_id=machine_id,
-                is_active=True
-            )
-            activation.last_check = timezone.now()
-            activation.ip_address = get_client_ip(request)
-            activation.save()
+            activation = LicenseActivation.objects.select_related('license').only(
+                'id', 'license',
+                *(f'license__{field}' for field in CHECK_LICENSE_FIELDS)
+            ).annotate(
+                license_valid=License.is_valid_expression('license__')
+            ).get(license_id=license_id, machine_id=machine_id, is_active=True)
         except LicenseActivation.DoesNotExist:
-            return JsonResponse({
+            if not License.objects.filter(id=license_id).exists():
+                return OrjsonResponse({
+                    'valid': False,
+                    'error': 'License not found'
+                }, status=400)
+            return OrjsonResponse({
                 'valid': False,
                 'error': 'Machine not activated'
             }, status=400)
+        license_obj = activation.license
 
-        # Check if license is valid or in grace period
-        is_valid = license_obj.is_valid()
-        in_grace_period = license_obj.is_in_grace_period() if hasattr(license_obj, 'is_in_grace_period') else False
+        # Record the check (at most once per interval)
+        _record_heartbeat(activation.pk, request.client_ip)
+
+        # Check if license is valid (evaluated in the SELECT) or in grace
+        # period (only possible once it is no longer valid)
+        is_valid = activation.license_valid
+        in_grace_period = not is_valid and license_obj.is_in_grace_period()
 
         # Check if license was renewed (expiry date changed)
         was_renewed = False
         if last_known_expiry:
             try:
-                from datetime import datetime
-                last_expiry = datetime.fromisoformat(last_known_expiry.replace('Z', '+00:00'))
+                last_expiry = parse_datetime(last_known_expiry)
+            except (ValueError, TypeError):
+                last_expiry = None
+            if last_expiry is not None:
                 if timezone.is_naive(last_expiry):
                     last_expiry = timezone.make_aware(last_expiry)
                 was_renewed = license_obj.valid_until > last_expiry
-            except (ValueError, TypeError):
-                pass
 
         if not is_valid and not in_grace_period:
-            return JsonResponse({
+            return OrjsonResponse({
                 'valid': False,
                 'error': 'License expired',
                 'expired': True,
-                'valid_until': license_obj.valid_until.isoformat(),
+                'valid_until': license_obj.valid_until,
                 'can_renew': True,
                 'billing_cycle': license_obj.billing_cycle,
             }, status=400)
@@ -243,7 +336,7 @@ def check_license(request):
         response_data = {
             'valid': True,
             'days_remaining': license_obj.days_remaining(),
-            'valid_until': license_obj.valid_until.isoformat(),
+            'valid_until': license_obj.valid_until,
             'renewed': was_renewed,
             'in_grace_period': in_grace_period,
             'billing_cycle': license_obj.billing_cycle,
@@ -252,25 +345,16 @@ def check_license(request):
 
         # If renewed, include full license data so client can update local storage
         if was_renewed:
-            response_data['license'] = {
-                'id': str(license_obj.id),
-                'type': license_obj.license_type,
-                'customer_name': license_obj.customer_name,
-                'customer_email': license_obj.customer_email,
-                'valid_until': license_obj.valid_until.isoformat(),
-                'days_remaining': license_obj.days_remaining(),
-                'renewal_count': license_obj.renewal_count,
-            }
+            response_data['license'] = _license_payload(license_obj, (
+                'id', 'type', 'customer_name', 'customer_email', 'valid_until',
+                'days_remaining', 'renewal_count',
+            ))
 
-        return JsonResponse(response_data)
+        body = json_dumps(response_data)
+        return _conditional_json(request, body, _body_etag(body))
 
-    except json.JSONDecodeError:
-        return JsonResponse({
-            'valid': False,
-            'error': 'Invalid JSON'
-        }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return OrjsonResponse({
             'valid': False,
             'error': str(e)
         }, status=500)
@@ -278,7 +362,8 @@ def check_license(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def renew_license(request):
+@json_body()
+def renew_license(request, data):
     """
     Renew a license (called after payment is confirmed).
     This is typically called by admin/payment webhook, not directly by app.
@@ -292,7 +377,6 @@ def renew_license(request):
     }
     """
     try:
-        data = json.loads(request.body)
         license_id = data.get('license_id', '').strip()
         admin_key = data.get('admin_key', '').strip()
         extend_days = data.get('extend_days')
@@ -300,17 +384,14 @@ def renew_license(request):
 
         # Simple admin key check (in production, use proper auth)
         # You should set this in Django settings
-        from django.conf import settings
-        expected_key = getattr(settings, 'LICENSE_ADMIN_KEY', 'retailease-admin-secret')
-
-        if admin_key != expected_key:
-            return JsonResponse({
+        if not _secret_matches(admin_key, _ADMIN_KEY):
+            return OrjsonResponse({
                 'success': False,
                 'error': 'Unauthorized'
             }, status=401)
 
         if not license_id:
-            return JsonResponse({
+            return OrjsonResponse({
                 'success': False,
                 'error': 'License ID is required'
             }, status=400)
@@ -318,7 +399,7 @@ def renew_license(request):
         try:
             license_obj = License.objects.get(id=license_id)
         except License.DoesNotExist:
-            return JsonResponse({
+            return OrjsonResponse({
                 'success': False,
                 'error': 'License not found'
             }, status=404)
@@ -331,28 +412,25 @@ def renew_license(request):
         renewal_note = f"\n[{timezone.now().isoformat()}] Renewed from {old_valid_until.date()} to {new_valid_until.date()}"
         if payment_reference:
             renewal_note += f" (Payment: {payment_reference})"
-        license_obj.notes += renewal_note
-        license_obj.save(update_fields=['notes'])
+        # Append in SQL so concurrent edits to notes are not lost
+        License.objects.filter(pk=license_obj.pk).update(
+            notes=Concat('notes', Value(renewal_note), output_field=TextField())
+        )
 
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'license': {
                 'id': str(license_obj.id),
                 'customer_name': license_obj.customer_name,
-                'old_valid_until': old_valid_until.isoformat(),
-                'new_valid_until': new_valid_until.isoformat(),
+                'old_valid_until': old_valid_until,
+                'new_valid_until': new_valid_until,
                 'days_remaining': license_obj.days_remaining(),
                 'renewal_count': license_obj.renewal_count,
             }
         })
 
-    except json.JSONDecodeError:
-        return JsonResponse({
-            'success': False,
-            'error': 'Invalid JSON'
-        }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return OrjsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
@@ -360,7 +438,11 @@ def renew_license(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def refresh_license(request):
+@json_body(required=[
+    ('license_id', 'License ID and Machine ID are required'),
+    ('machine_id', 'License ID and Machine ID are required'),
+], uuid_fields=[('license_id', 'Invalid license ID')], error_fields={'success': False, 'valid': False})
+def refresh_license(request, data):
     """
     Refresh license data from server (called by app to get latest license info).
     If license was renewed on backend, returns updated license data.
@@ -376,91 +458,84 @@ def refresh_license(request):
     }
     """
     try:
-        data = json.loads(request.body)
         license_id = data.get('license_id', '').strip()
         machine_id = data.get('machine_id', '').strip()
 
-        if not license_id or not machine_id:
-            return JsonResponse({
-                'success': False,
-                'valid': False,
-                'error': 'License ID and Machine ID are required'
-            }, status=400)
-
+        # Successful refreshes are cached briefly per license and machine
+        refresh_cache_key = License.refresh_cache_key(license_id)
+        cached = (cache.get(refresh_cache_key) or {}).get(machine_id)
+        # The cache is per-process, so a revocation or deactivation made in
+        # another worker never evicts the entry; re-check both before using
+        # it, and otherwise build the current response below
+        if cached is not None and cached[0] > time.time() and LicenseActivation.objects.filter(
+            pk=cached[1], is_active=True, license__status='active'
+        ).exists():
+            _record_heartbeat(cached[1], request.client_ip)
+            return _conditional_json(request, cached[2], cached[3])
+
+        # Fetch the activation and its license in one JOINed SELECT; the
+        # license is looked up on its own only for unactivated machines
         try:
-            license_obj = License.objects.get(id=license_id)
-        except License.DoesNotExist:
-            return JsonResponse({
-                'success': False,
-                'valid': False,
-                'error': 'License not found'
-            }, status=404)
+            activation = LicenseActivation.objects.select_related('license').only(
+                'id', 'is_active', 'license',
+                *(f'license__{field}' for field in REFRESH_LICENSE_FIELDS)
+            ).get(license_id=license_id, machine_id=machine_id)
+            license_obj = activation.license
+        except LicenseActivation.DoesNotExist:
+            activation = None
+            try:
+                license_obj = License.objects.only(*REFRESH_LICENSE_FIELDS).get(id=license_id)
+            except License.DoesNotExist:
+                return OrjsonResponse({
+                    'success': False,
+                    'valid': False,
+                    'error': 'License not found'
+                }, status=404)
 
         # Check license status FIRST before checking machine activation
         # This ensures deactivated/revoked licenses are caught even if machine is valid
         if license_obj.status == 'revoked':
-            return JsonResponse({
+            return OrjsonResponse({
                 'success': False,
                 'valid': False,
                 'error': 'License has been revoked',
                 'status': 'revoked',
-                'license': {
-                    'id': str(license_obj.id),
-                    'type': license_obj.license_type,
-                    'customer_name': license_obj.customer_name,
-                    'customer_email': license_obj.customer_email,
-                    'valid_until': license_obj.valid_until.isoformat(),
-                    'status': license_obj.status,
-                }
+                'license': _license_payload(license_obj, (
+                    'id', 'type', 'customer_name', 'customer_email', 'valid_until', 'status',
+                ))
             })
 
         if license_obj.status == 'suspended':
-            return JsonResponse({
+            return OrjsonResponse({
                 'success': False,
                 'valid': False,
                 'error': 'License has been suspended. Please contact support.',
                 'status': 'suspended',
-                'license': {
-                    'id': str(license_obj.id),
-                    'type': license_obj.license_type,
-                    'customer_name': license_obj.customer_name,
-                    'customer_email': license_obj.customer_email,
-                    'valid_until': license_obj.valid_until.isoformat(),
-                    'status': license_obj.status,
-                }
+                'license': _license_payload(license_obj, (
+                    'id', 'type', 'customer_name', 'customer_email', 'valid_until', 'status',
+                ))
             })
 
         # Verify machine is activated
-        try:
-            activation = LicenseActivation.objects.get(
-                license=license_obj,
-                machine_id=machine_id
-            )
-
-            # Check if this specific activation is deactivated
-            if not activation.is_active:
-                return JsonResponse({
-                    'success': False,
-                    'valid': False,
-                    'error': 'This device has been deactivated. Please reactivate.',
-                    'status': 'device_deactivated',
-                    'license': {
-                        'id': str(license_obj.id),
-                        'type': license_obj.license_type,
-                        'customer_name': license_obj.customer_name,
-                        'status': license_obj.status,
-                    }
-                })
-
-            activation.last_check = timezone.now()
-            activation.save(update_fields=['last_check'])
-        except LicenseActivation.DoesNotExist:
-            return JsonResponse({
+        if activation is None:
+            return OrjsonResponse({
                 'success': False,
                 'valid': False,
                 'error': 'Machine not activated for this license'
             }, status=403)
 
+        # Check if this specific activation is deactivated
+        if not activation.is_active:
+            return OrjsonResponse({
+                'success': False,
+                'valid': False,
+                'error': 'This device has been deactivated. Please reactivate.',
+                'status': 'device_deactivated',
+                'license': _license_payload(license_obj, ('id', 'type', 'customer_name', 'status'))
+            })
+
+        _record_heartbeat(activation.pk, request.client_ip)
+
         # Check validity and grace period
         is_valid = license_obj.is_valid()
         in_grace_period = license_obj.is_in_grace_period()
@@ -469,61 +544,40 @@ def refresh_license(request):
         now = timezone.now()
         is_expired = now > license_obj.valid_until
 
-        # Update status to expired if needed
-        if is_expired and license_obj.status == 'active' and not in_grace_period:
-            license_obj.status = 'expired'
-            license_obj.save(update_fields=['status', 'updated_at'])
-
-        # If expired and not in grace period, return error with full info
+        # If expired and not in grace period, flag the lapse and return error
+        # with full info
         if is_expired and not in_grace_period:
-            return JsonResponse({
+            if license_obj.status == 'active':
+                License.objects.filter(pk=license_obj.pk, status='active').update(
+                    status='expired', updated_at=now
+                )
+            return OrjsonResponse({
                 'success': False,
                 'valid': False,
                 'error': 'License has expired',
                 'status': 'expired',
                 'in_grace_period': False,
-                'license': {
-                    'id': str(license_obj.id),
-                    'type': license_obj.license_type,
-                    'customer_name': license_obj.customer_name,
-                    'customer_email': license_obj.customer_email,
-                    'valid_from': license_obj.valid_from.isoformat(),
-                    'valid_until': license_obj.valid_until.isoformat(),
-                    'days_remaining': 0,
-                    'status': 'expired',
-                    'billing_cycle': license_obj.billing_cycle,
-                    'renewal_count': license_obj.renewal_count,
-                    'last_renewed_at': license_obj.last_renewed_at.isoformat() if license_obj.last_renewed_at else None,
-                }
+                'license': _license_payload(
+                    license_obj, FULL_LICENSE_PAYLOAD, days_remaining=0, status='expired'
+                )
             })
 
         # License is valid (or in grace period)
-        return JsonResponse({
+        response_data = {
             'success': True,
             'valid': True,
             'in_grace_period': in_grace_period,
-            'license': {
-                'id': str(license_obj.id),
-                'type': license_obj.license_type,
-                'customer_name': license_obj.customer_name,
-                'customer_email': license_obj.customer_email,
-                'valid_from': license_obj.valid_from.isoformat(),
-                'valid_until': license_obj.valid_until.isoformat(),
-                'days_remaining': license_obj.days_remaining(),
-                'status': license_obj.status,
-                'billing_cycle': license_obj.billing_cycle,
-                'renewal_count': license_obj.renewal_count,
-                'last_renewed_at': license_obj.last_renewed_at.isoformat() if license_obj.last_renewed_at else None,
-            }
-        })
+            'license': _license_payload(license_obj, FULL_LICENSE_PAYLOAD),
+        }
+        body = json_dumps(response_data)
+        etag = _body_etag(body)
+        responses = cache.get(refresh_cache_key) or {}
+        responses[machine_id] = (time.time() + REFRESH_CACHE_TTL, activation.pk, body, etag)
+        cache.set(refresh_cache_key, responses, REFRESH_CACHE_TTL)
+        return _conditional_json(request, body, etag)
 
-    except json.JSONDecodeError:
-        return JsonResponse({
-            'success': False,
-            'error': 'Invalid JSON'
-        }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return OrjsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
@@ -531,7 +585,11 @@ def refresh_license(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def deactivate_license(request):
+@json_body(required=[
+    ('license_id', 'License ID and Machine ID are required'),
+    ('machine_id', 'License ID and Machine ID are required'),
+], uuid_fields=[('license_id', 'Invalid license ID')])
+def deactivate_license(request, data):
     """
     Deactivate a license on a specific machine.
     
@@ -542,67 +600,78 @@ def deactivate_license(request):
     }
     """
     try:
-        data = json.loads(request.body)
         license_id = data.get('license_id', '').strip()
         machine_id = data.get('machine_id', '').strip()
         
-        if not license_id or not machine_id:
-            return JsonResponse({
-                'success': False,
-                'error': 'License ID and Machine ID are required'
-            }, status=400)
-        
-        try:
-            activation = LicenseActivation.objects.get(
-                license_id=license_id,
-                machine_id=machine_id
-            )
-            activation.is_active = False
-            activation.save()
-            
-            # Update activation count
-            license_obj = activation.license
-            license_obj.current_activations = license_obj.activations.filter(is_active=True).count()
-            license_obj.save()
-            
-            return JsonResponse({
-                'success': True,
-                'message': 'License deactivated successfully'
-            })
-        except LicenseActivation.DoesNotExist:
-            return JsonResponse({
+        # Single UPDATE; the license row itself is never loaded
+        updated = LicenseActivation.objects.filter(
+            license_id=license_id,
+            machine_id=machine_id
+        ).update(is_active=False)
+        if not updated:
+            return OrjsonResponse({
                 'success': False,
                 'error': 'Activation not found'
             }, status=400)
         
-    except json.JSONDecodeError:
-        return JsonResponse({
-            'success': False,
-            'error': 'Invalid JSON'
-        }, status=400)
+        # update() skips post_save, so schedule the recount explicitly
+        schedule_activation_recount(license_id)
+        License.forget_refresh_responses([license_id])
+        
+        return OrjsonResponse({
+            'success': True,
+            'message': 'License deactivated successfully'
+        })
+        
     except Exception as e:
-        return JsonResponse({
+        return OrjsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
 
 
+# (public_key, serialized body, ETag) for the last key served
+_public_key_response = None
+
+
+def _public_key_body(public_key):
+    """Return the cached JSON body and ETag for public_key"""
+    global _public_key_response
+    cached = _public_key_response
+    if cached is None or cached[0] != public_key:
+        cached = (
+            public_key,
+            json_dumps({'public_key': public_key}),
+            quote_etag(hashlib.sha256(public_key.encode('utf-8')).hexdigest()[:16]),
+        )
+        _public_key_response = cached
+    return cached[1], cached[2]
+
+
+@gzip_page
 def get_public_key(request):
     """Return the public key for embedding in apps"""
-    key_pair = LicenseKey.objects.filter(is_active=True).first()
-    if not key_pair:
-        return JsonResponse({
+    public_key = LicenseKey.get_active_public_key()
+    if not public_key:
+        return OrjsonResponse({
             'error': 'No active key pair'
         }, status=500)
 
-    return JsonResponse({
-        'public_key': key_pair.public_key
-    })
+    # The key only changes on rotation; let clients and proxies keep it for
+    # as long as the server-side cache does and revalidate via the ETag
+    body, etag = _public_key_body(public_key)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=ACTIVE_PUBLIC_KEY_CACHE_TTL)
+    return response
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def get_licenses_by_email(request):
+@json_body(required=[('email', 'Email is required')])
+def get_licenses_by_email(request, data):
     """
     Get all licenses for a customer email.
     Used by RetailEase website to show licenses in user dashboard.
@@ -635,22 +704,12 @@ def get_licenses_by_email(request):
     }
     """
     try:
-        data = json.loads(request.body)
         email = data.get('email', '').strip().lower()
         api_key = data.get('api_key', '').strip()
 
-        if not email:
-            return JsonResponse({
-                'success': False,
-                'error': 'Email is required'
-            }, status=400)
-
         # Verify API key (shared secret between RetailEase website and ralfizdigital)
-        from django.conf import settings
-        expected_key = getattr(settings, 'RETAILEASE_WEBSITE_API_KEY', 'retailease-website-secret')
-
-        if api_key != expected_key:
-            return JsonResponse({
+        if not _secret_matches(api_key, _WEBSITE_API_KEY):
+            return OrjsonResponse({
                 'success': False,
                 'error': 'Invalid API key'
             }, status=401)
@@ -667,7 +726,7 @@ def get_licenses_by_email(request):
             # Update status if expired
             if lic.status == 'active' and not lic.is_valid() and not lic.is_in_grace_period():
                 lic.status = 'expired'
-                lic.save(update_fields=['status', 'updated_at'])
+                License.objects.filter(pk=lic.pk).update(status='expired', updated_at=timezone.now())
 
             license_data = {
                 'id': str(lic.id),
@@ -676,8 +735,8 @@ def get_licenses_by_email(request):
                 'license_type_display': lic.get_license_type_display(),
                 'status': lic.status,
                 'status_display': lic.get_status_display(),
-                'valid_from': lic.valid_from.isoformat(),
-                'valid_until': lic.valid_until.isoformat(),
+                'valid_from': lic.valid_from,
+                'valid_until': lic.valid_until,
                 'days_remaining': lic.days_remaining(),
                 'is_valid': lic.is_valid(),
                 'in_grace_period': lic.is_in_grace_period(),
@@ -688,7 +747,7 @@ def get_licenses_by_email(request):
                 'max_activations': lic.max_activations,
                 'current_activations': lic.current_activations,
                 'renewal_count': lic.renewal_count,
-                'created_at': lic.created_at.isoformat(),
+                'created_at': lic.created_at,
             }
 
             # Include client info if linked
@@ -703,20 +762,15 @@ def get_licenses_by_email(request):
 
             licenses_data.append(license_data)
 
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'email': email,
             'count': len(licenses_data),
             'licenses': licenses_data
         })
 
-    except json.JSONDecodeError:
-        return JsonResponse({
-            'success': False,
-            'error': 'Invalid JSON'
-        }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return OrjsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
@@ -1,8 +1,30 @@
+from functools import lru_cache
+
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
 from .models import Business, Counter, Backup, SyncLog, APIToken
 
 
+# Changelist formatting helpers. Backup sizes repeat across rows and page
+# loads, so their strings are memoized.
+@lru_cache(maxsize=1024)
+def _format_size(size):
+    if size < 1024:
+        return f"{size} B"
+    elif size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    else:
+        return f"{size / (1024 * 1024):.1f} MB"
+
+
+def _format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    else:
+        return f"{seconds / 60:.1f}m"
+
+
 @admin.register(Business)
 class BusinessAdmin(admin.ModelAdmin):
     list_display = ('name', 'license_customer', 'email', 'phone', 'gst_number', 'counters_count', 'created_at')
@@ -32,18 +54,25 @@ class BusinessAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('license').annotate(
+            _counters_count=Count('counters')
+        )
+
     def license_customer(self, obj):
         return obj.license.customer_name
     license_customer.short_description = 'License Customer'
 
     def counters_count(self, obj):
-        return obj.counters.count()
+        return obj._counters_count
     counters_count.short_description = 'Counters'
+    counters_count.admin_order_field = '_counters_count'
 
 
 @admin.register(Counter)
 class CounterAdmin(admin.ModelAdmin):
     list_display = ('name', 'business', 'device_type', 'status', 'is_primary', 'app_version', 'last_sync_at')
+    list_select_related = ('business__license',)
     list_filter = ('status', 'is_primary', 'device_type', 'sync_enabled')
     search_fields = ('name', 'business__name', 'device_name')
     readonly_fields = ('id', 'created_at', 'updated_at', 'last_sync_at')
@@ -68,6 +97,7 @@ class CounterAdmin(admin.ModelAdmin):
 @admin.register(Backup)
 class BackupAdmin(admin.ModelAdmin):
     list_display = ('filename', 'business', 'counter', 'backup_type', 'status', 'file_size_display', 'created_at')
+    list_select_related = ('business__license', 'counter__business')
     list_filter = ('backup_type', 'status', 'is_encrypted', 'created_at')
     search_fields = ('filename', 'business__name', 'counter__name')
     readonly_fields = ('id', 'created_at', 'uploaded_at', 'checksum', 'file_size')
@@ -97,18 +127,14 @@ class BackupAdmin(admin.ModelAdmin):
     )
 
     def file_size_display(self, obj):
-        if obj.file_size < 1024:
-            return f"{obj.file_size} B"
-        elif obj.file_size < 1024 * 1024:
-            return f"{obj.file_size / 1024:.1f} KB"
-        else:
-            return f"{obj.file_size / (1024 * 1024):.1f} MB"
+        return _format_size(obj.file_size)
     file_size_display.short_description = 'Size'
 
 
 @admin.register(SyncLog)
 class SyncLogAdmin(admin.ModelAdmin):
     list_display = ('business', 'counter', 'sync_type', 'sync_direction', 'status_badge', 'records_uploaded', 'records_downloaded', 'duration_display', 'started_at')
+    list_select_related = ('business__license', 'counter__business')
     list_filter = ('sync_type', 'sync_direction', 'status', 'started_at')
     search_fields = ('business__name', 'counter__name')
     readonly_fields = ('id', 'started_at', 'completed_at', 'duration_seconds')
@@ -151,10 +177,7 @@ class SyncLogAdmin(admin.ModelAdmin):
 
     def duration_display(self, obj):
         if obj.duration_seconds:
-            if obj.duration_seconds < 60:
-                return f"{obj.duration_seconds:.1f}s"
-            else:
-                return f"{obj.duration_seconds / 60:.1f}m"
+            return _format_duration(obj.duration_seconds)
         return '-'
     duration_display.short_description = 'Duration'
 
@@ -162,16 +185,17 @@ class SyncLogAdmin(admin.ModelAdmin):
 @admin.register(APIToken)
 class APITokenAdmin(admin.ModelAdmin):
     list_display = ('license_customer', 'counter', 'name', 'is_active', 'token_preview', 'last_used_at', 'created_at')
+    list_select_related = ('license', 'counter__business')
     list_filter = ('is_active', 'created_at', 'last_used_at')
-    search_fields = ('license__customer_name', 'name', 'token')
-    readonly_fields = ('id', 'token', 'created_at', 'last_used_at')
+    search_fields = ('license__customer_name', 'name')
+    readonly_fields = ('id', 'token_preview', 'created_at', 'last_used_at')
 
     fieldsets = (
         ('Basic Information', {
             'fields': ('id', 'license', 'counter', 'name')
         }),
         ('Token', {
-            'fields': ('token', 'is_active', 'expires_at')
+            'fields': ('token_preview', 'is_active', 'expires_at')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'last_used_at'),
@@ -184,5 +208,6 @@ class APITokenAdmin(admin.ModelAdmin):
     license_customer.short_description = 'Customer'
 
     def token_preview(self, obj):
-        return f"{obj.token[:8]}...{obj.token[-8:]}" if obj.token else '-'
-    token_preview.short_description = 'Token'
\ No newline at end of file
+        # Tokens are stored hashed; show the start of the hash to tell them apart
+        return f"{bytes(obj.token_hash).hex()[:16]}..." if obj.token_hash else '-'
+    token_preview.short_description = 'Token hash'
\ No newline at end of file
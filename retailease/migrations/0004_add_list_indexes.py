@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-15 23:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retailease', '0003_delete_appconfig'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='apitoken',
+            index=models.Index(fields=['license', 'counter'], name='apitoken_license_counter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='backup',
+            index=models.Index(fields=['business', '-created_at'], name='backup_biz_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='backup',
+            index=models.Index(fields=['business', 'backup_type', '-created_at'], name='backup_biz_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synclog',
+            index=models.Index(fields=['business', '-started_at'], name='synclog_biz_started_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synclog',
+            index=models.Index(fields=['counter', '-started_at'], name='synclog_counter_started_idx'),
+        ),
+    ]
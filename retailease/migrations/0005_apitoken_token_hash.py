@@ -0,0 +1,37 @@
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_tokens(apps, schema_editor):
+    APIToken = apps.get_model('retailease', 'APIToken')
+    tokens = list(APIToken.objects.only('pk', 'token'))
+    for api_token in tokens:
+        api_token.token_hash = hashlib.sha256(api_token.token.encode('utf-8')).digest()
+    APIToken.objects.bulk_update(tokens, ['token_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retailease', '0004_add_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apitoken',
+            name='token_hash',
+            field=models.BinaryField(editable=False, max_length=32, null=True),
+        ),
+        # Plaintext tokens cannot be recovered, so this is irreversible
+        migrations.RunPython(hash_existing_tokens),
+        migrations.RemoveField(
+            model_name='apitoken',
+            name='token',
+        ),
+        migrations.AlterField(
+            model_name='apitoken',
+            name='token_hash',
+            field=models.BinaryField(editable=False, max_length=32, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('retailease', '0005_apitoken_token_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='counter',
+            index=models.Index(fields=['business', 'name'], name='counter_business_name_idx'),
+        ),
+    ]
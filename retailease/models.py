@@ -1,9 +1,22 @@
 import uuid
-import os
+import hashlib
+from django.core.cache import cache
 from django.db import models
+from django.db.models import Count
 from django.utils import timezone
 from licensing.models import License, LicenseActivation
 
+from .tasks import delete_backup_files
+
+# Resolved API tokens are cached briefly; signals drop an entry when the
+# token, its license or its counter changes
+TOKEN_CACHE_TTL = 60
+# Minimum seconds between last_used_at writes for one token
+LAST_USED_WRITE_INTERVAL = 60
+# A license's registered business is cached too; signals drop the entry
+# when a business is saved or deleted or gains or loses a counter
+BUSINESS_CACHE_TTL = 60
+
 
 class Business(models.Model):
     """
@@ -61,6 +74,33 @@ class Business(models.Model):
     def __str__(self):
         return f"{self.name} ({self.license.customer_name})"
 
+    @staticmethod
+    def cache_key(license_id):
+        return f'retailease:business:{license_id}'
+
+    @classmethod
+    def get_cached_for_license(cls, license_id):
+        """
+        Return the business registered under a license, or None, cached for
+        BUSINESS_CACHE_TTL seconds and annotated with counters_count. Use a
+        fresh query before editing it.
+        """
+        cache_key = cls.cache_key(license_id)
+        business = cache.get(cache_key)
+        if business is None:
+            business = cls.objects.filter(license_id=license_id).annotate(
+                counters_count=Count('counters')
+            ).first()
+            # A missing business is not cached, so a registration handled by
+            # another worker is seen immediately
+            if business is not None:
+                cache.set(cache_key, business, BUSINESS_CACHE_TTL)
+        return business
+
+    @classmethod
+    def forget_cached(cls, license_id):
+        cache.delete(cls.cache_key(license_id))
+
 
 class Counter(models.Model):
     """
@@ -112,6 +152,9 @@ class Counter(models.Model):
         verbose_name = "Counter"
         verbose_name_plural = "Counters"
         ordering = ['business', 'name']
+        indexes = [
+            models.Index(fields=['business', 'name'], name='counter_business_name_idx'),
+        ]
 
     def __str__(self):
         return f"{self.business.name} - {self.name}"
@@ -191,16 +234,22 @@ class Backup(models.Model):
         verbose_name = "Backup"
         verbose_name_plural = "Backups"
         ordering = ['-created_at']
+        # Backup listings and cleanup are per business, newest first
+        indexes = [
+            models.Index(fields=['business', '-created_at'], name='backup_biz_created_idx'),
+            models.Index(fields=['business', 'backup_type', '-created_at'], name='backup_biz_type_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.business.name} - {self.filename}"
 
     def delete(self, *args, **kwargs):
-        # Delete the file when the model is deleted
-        if self.file:
-            if os.path.isfile(self.file.path):
-                os.remove(self.file.path)
-        super().delete(*args, **kwargs)
+        # Delete the file when the model is deleted (in the background,
+        # after the row is gone)
+        name, storage = self.file.name, self.file.storage
+        result = super().delete(*args, **kwargs)
+        delete_backup_files(storage, [name])
+        return result
 
 
 class SyncLog(models.Model):
@@ -264,18 +313,27 @@ class SyncLog(models.Model):
         verbose_name = "Sync Log"
         verbose_name_plural = "Sync Logs"
         ordering = ['-started_at']
+        # Sync history is per business (optionally per counter), newest first
+        indexes = [
+            models.Index(fields=['business', '-started_at'], name='synclog_biz_started_idx'),
+            models.Index(fields=['counter', '-started_at'], name='synclog_counter_started_idx'),
+        ]
 
     def __str__(self):
         return f"{self.business.name} - {self.counter.name} - {self.sync_type} ({self.status})"
 
-    def complete(self, status='completed', error_message=''):
-        """Mark sync as complete"""
+    def complete(self, status='completed', error_message='', **fields):
+        """Mark sync as complete, also setting any other fields given"""
+        for name, value in fields.items():
+            setattr(self, name, value)
         self.status = status
         self.completed_at = timezone.now()
         self.duration_seconds = (self.completed_at - self.started_at).total_seconds()
         if error_message:
             self.error_message = error_message
-        self.save()
+        self.save(update_fields=[
+            'status', 'completed_at', 'duration_seconds', 'error_message', *fields
+        ])
 
 
 class APIToken(models.Model):
@@ -297,8 +355,8 @@ class APIToken(models.Model):
         related_name='api_tokens'
     )
 
-    # Token
-    token = models.CharField(max_length=64, unique=True, db_index=True)
+    # SHA-256 of the token; the token itself is only shown to the client
+    token_hash = models.BinaryField(max_length=32, unique=True, editable=False)
 
     # Metadata
     name = models.CharField(max_length=100, blank=True, help_text="Token name/description")
@@ -313,6 +371,9 @@ class APIToken(models.Model):
         verbose_name = "API Token"
         verbose_name_plural = "API Tokens"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['license', 'counter'], name='apitoken_license_counter_idx'),
+        ]
 
     def __str__(self):
         return f"{self.license.customer_name} - {self.name or 'Token'}"
@@ -325,13 +386,61 @@ class APIToken(models.Model):
             return False
         return self.license.is_valid()
 
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
     @classmethod
     def generate_token(cls):
-        """Generate a secure random token"""
+        """Generate a secure random token; returns (token, token_hash)"""
         import secrets
-        return secrets.token_hex(32)
+        token = secrets.token_hex(32)
+        return token, cls.hash_token(token)
 
     def update_last_used(self):
-        """Update last used timestamp"""
-        self.last_used_at = timezone.now()
-        self.save(update_fields=['last_used_at'])
\ No newline at end of file
+        """Update last used timestamp (at most once per LAST_USED_WRITE_INTERVAL)"""
+        try:
+            due = cache.add(f'retailease:token_used:{self.pk}', 1, LAST_USED_WRITE_INTERVAL)
+        except Exception:
+            # Cache unavailable: fall back to writing every time
+            due = True
+        if due:
+            self.last_used_at = timezone.now()
+            # update() rather than save() so the token cache is left alone
+            APIToken.objects.filter(pk=self.pk).update(last_used_at=self.last_used_at)
+
+    @staticmethod
+    def cache_key(token_hash):
+        return 'retailease:token:' + bytes(token_hash).hex()
+
+    @classmethod
+    def get_cached(cls, token):
+        """
+        Return the APIToken (with license and counter) for a token value,
+        cached for TOKEN_CACHE_TTL seconds. Raises APIToken.DoesNotExist.
+        """
+        token_hash = cls.hash_token(token)
+        cache_key = cls.cache_key(token_hash)
+        api_token = cache.get(cache_key)
+        if api_token is None:
+            api_token = cls.objects.select_related('license', 'counter').get(token_hash=token_hash)
+            cache.set(cache_key, api_token, TOKEN_CACHE_TTL)
+            return api_token
+
+        # The cache is per-process, so a revocation made by another worker
+        # never evicts this entry; re-read the fields is_valid() checks
+        state = cls.objects.filter(pk=api_token.pk).values_list(
+            'is_active', 'expires_at',
+            'license__status', 'license__valid_from', 'license__valid_until'
+        ).first()
+        if state is None:
+            cache.delete(cache_key)
+            raise cls.DoesNotExist('APIToken matching query does not exist.')
+        (api_token.is_active, api_token.expires_at, api_token.license.status,
+         api_token.license.valid_from, api_token.license.valid_until) = state
+        return api_token
+
+    @classmethod
+    def forget_cached(cls, token_hashes):
+        """Drop cached lookups for these token hashes"""
+        cache.delete_many([cls.cache_key(token_hash) for token_hash in token_hashes if token_hash])
\ No newline at end of file
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from licensing.models import License
+
+from .models import APIToken, Business, Counter
+
+
+@receiver(post_save, sender=APIToken)
+@receiver(post_delete, sender=APIToken)
+def token_changed(sender, instance, **kwargs):
+    APIToken.forget_cached([instance.token_hash])
+
+
+@receiver(post_save, sender=License)
+@receiver(post_save, sender=Counter)
+def token_owner_changed(sender, instance, **kwargs):
+    # Cached tokens carry their license and counter, so drop them too
+    owner = 'license' if sender is License else 'counter'
+    APIToken.forget_cached(
+        APIToken.objects.filter(**{owner: instance}).values_list('token_hash', flat=True)
+    )
+
+
+@receiver(post_save, sender=Business)
+@receiver(post_delete, sender=Business)
+def business_changed(sender, instance, **kwargs):
+    Business.forget_cached(instance.license_id)
+
+
+@receiver(post_save, sender=Counter)
+@receiver(post_delete, sender=Counter)
+def counter_added_or_removed(sender, instance, created=True, **kwargs):
+    # Cached businesses carry counters_count
+    if created:
+        license_id = Business.objects.filter(pk=instance.business_id).values_list(
+            'license_id', flat=True
+        ).first()
+        if license_id is not None:
+            Business.forget_cached(license_id)
@@ -0,0 +1,33 @@
+"""
+Background tasks for the RetailEase app.
+
+Removing backup files from storage can be slow (large files, network
+storage), so it runs on a small in-process thread pool after the deleting
+transaction commits instead of inside the request.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='retailease-task')
+
+
+def _delete_files(storage, names):
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.exception('Deleting backup file %s failed', name)
+
+
+def delete_backup_files(storage, names):
+    """
+    Delete files from storage in the background once the current
+    transaction commits (nothing is deleted if it rolls back).
+    """
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(lambda: _executor.submit(_delete_files, storage, names))
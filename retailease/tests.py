@@ -1,3 +1,144 @@
-from django.test import TestCase
+import hashlib
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from licensing.models import License, LicenseActivation, LicenseKey
+
+from .models import APIToken, Business
+
+
+class RetailEaseAPITestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.key_pair = LicenseKey.generate_key_pair(key_size=2048)
+
+    def setUp(self):
+        cache.clear()
+        self.license = License.objects.create(
+            key_pair=self.key_pair,
+            customer_name='Test Customer',
+            customer_email='test@example.com',
+            max_activations=2,
+        )
+
+    def authenticate(self, machine_id):
+        return self.client.post(
+            '/api/retailease/auth/',
+            {'license_id': str(self.license.id), 'machine_id': machine_id},
+            content_type='application/json',
+        )
+
+    def get(self, path, token):
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+class StatusTests(RetailEaseAPITestCase):
+    def test_warm_status_only_rechecks_token(self):
+        Business.objects.create(license=self.license, name='Shop')
+        token = self.authenticate('machine-1').json()['token']
+        self.assertEqual(self.get('/api/retailease/status/', token).status_code, 200)
+
+        # Token, license, counter and business come from the cache; the
+        # one query re-checks the token's revocation state
+        with self.assertNumQueries(1):
+            response = self.get('/api/retailease/status/', token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['business']['name'], 'Shop')
+        self.assertEqual(response.json()['business']['counters_count'], 1)
+
+
+class AuthenticateTests(RetailEaseAPITestCase):
+    def test_activations_are_capped(self):
+        self.assertEqual(self.authenticate('machine-1').status_code, 200)
+        self.assertEqual(self.authenticate('machine-2').status_code, 200)
+
+        response = self.authenticate('machine-3')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['code'], 'MAX_ACTIVATIONS')
+        self.license.refresh_from_db()
+        self.assertEqual(self.license.current_activations, 2)
+        self.assertFalse(LicenseActivation.objects.filter(machine_id='machine-3').exists())
+
+    def test_returning_machine_reuses_its_activation(self):
+        self.authenticate('machine-1')
+        self.authenticate('machine-2')
+
+        # At the cap, but this machine already holds a slot
+        self.assertEqual(self.authenticate('machine-1').status_code, 200)
+        self.license.refresh_from_db()
+        self.assertEqual(self.license.current_activations, 2)
+        self.assertEqual(self.license.activations.count(), 2)
+
+    def test_returning_machine_reuses_its_counter(self):
+        Business.objects.create(license=self.license, name='Shop')
+        first = self.authenticate('machine-1').json()['counter']
+        second = self.authenticate('machine-1').json()['counter']
+
+        self.assertEqual(first['id'], second['id'])
+        self.assertTrue(first['is_primary'])
+
+    def test_second_device_keeps_first_device_logged_in(self):
+        first = self.authenticate('machine-1').json()['token']
+        second = self.authenticate('machine-2').json()['token']
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.get('/api/retailease/status/', first).status_code, 200)
+        self.assertEqual(self.get('/api/retailease/status/', second).status_code, 200)
+
+    def test_reauthenticating_a_counter_revokes_its_old_token(self):
+        Business.objects.create(license=self.license, name='Shop')
+        old = self.authenticate('machine-1').json()['token']
+        other = self.authenticate('machine-2').json()['token']
+        self.assertEqual(self.get('/api/retailease/status/', old).status_code, 200)
+
+        new = self.authenticate('machine-1').json()['token']
+        self.assertEqual(self.get('/api/retailease/status/', old).status_code, 401)
+        self.assertEqual(self.get('/api/retailease/status/', new).status_code, 200)
+        self.assertEqual(self.get('/api/retailease/status/', other).status_code, 200)
+        self.assertEqual(APIToken.objects.filter(is_active=True).count(), 2)
+
+    def test_logout_revokes_only_that_token(self):
+        first = self.authenticate('machine-1').json()['token']
+        second = self.authenticate('machine-2').json()['token']
+        self.get('/api/retailease/status/', first)
+
+        response = self.client.post('/api/retailease/auth/logout/', HTTP_AUTHORIZATION=f'Bearer {first}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get('/api/retailease/status/', first).status_code, 401)
+        self.assertEqual(self.get('/api/retailease/status/', second).status_code, 200)
+
+    def test_tokens_are_stored_hashed(self):
+        token = self.authenticate('machine-1').json()['token']
+
+        api_token = APIToken.objects.get()
+        self.assertEqual(bytes(api_token.token_hash), hashlib.sha256(token.encode('utf-8')).digest())
+
+
+class TokenHashMigrationTests(TransactionTestCase):
+    def test_existing_tokens_are_hashed(self):
+        key_pair = LicenseKey.generate_key_pair(key_size=2048)
+        license = License.objects.create(
+            key_pair=key_pair,
+            customer_name='Test Customer',
+            customer_email='test@example.com',
+        )
+
+        # 0005 is irreversible, so rebuild the table as 0004 left it
+        executor = MigrationExecutor(connection)
+        migration = executor.loader.get_migration('retailease', '0005_apitoken_token_hash')
+        state = executor.loader.project_state(('retailease', '0004_add_list_indexes'))
+        OldAPIToken = state.apps.get_model('retailease', 'APIToken')
+        with connection.schema_editor() as editor:
+            editor.delete_model(APIToken)
+            editor.create_model(OldAPIToken)
+        OldAPIToken.objects.create(license_id=license.pk, token='a' * 64, name='Old device')
+
+        with connection.schema_editor() as editor:
+            migration.apply(state, editor)
+
+        api_token = APIToken.objects.get(token_hash=hashlib.sha256(b'a' * 64).digest())
+        self.assertEqual(api_token.name, 'Old device')
+        self.assertEqual(APIToken.get_cached('a' * 64).pk, api_token.pk)
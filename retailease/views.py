@@ -1,52 +1,84 @@
 import json
 import hashlib
-from functools import wraps
-from django.http import JsonResponse
+import re
+from functools import lru_cache, wraps
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Window
 from django.utils import timezone
+from django.utils.http import content_disposition_header
 from django.core.files.base import ContentFile
 
 from licensing.models import License, LicenseActivation
+from licensing.signals import schedule_activation_recount
+from licensing.utils import OrjsonResponse, json_dumps, json_loads
 from core.models import CompanySettings, Client
 from .models import Business, Counter, Backup, SyncLog, APIToken
+from .tasks import delete_backup_files
+
+
+# Read size for hashing uploaded backups
+BACKUP_HASH_CHUNK_SIZE = 1024 * 1024
+
+# token_required's error bodies never change, so serialize them once
+_AUTH_REQUIRED_BODY = json_dumps({
+    'error': 'Missing or invalid Authorization header',
+    'code': 'AUTH_REQUIRED'
+})
+_INVALID_TOKEN_BODY = json_dumps({
+    'error': 'Invalid API token',
+    'code': 'INVALID_TOKEN'
+})
+_TOKEN_EXPIRED_BODY = json_dumps({
+    'error': 'Token is expired or inactive',
+    'code': 'TOKEN_EXPIRED'
+})
+
+
+def _sha256_hexdigest(uploaded_file):
+    """
+    SHA-256 of an uploaded file, read in blocks so large backups are never
+    held in memory whole. Leaves the file rewound.
+    """
+    if hasattr(hashlib, 'file_digest'):  # Python 3.11+: hashed in C
+        uploaded_file.seek(0)
+        digest = hashlib.file_digest(uploaded_file.file, 'sha256')
+    else:
+        digest = hashlib.sha256()
+        for chunk in uploaded_file.chunks(BACKUP_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
 
 
-def get_client_ip(request):
-    """Get client IP address from request"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        return x_forwarded_for.split(',')[0].strip()
-    return request.META.get('REMOTE_ADDR')
+def _unauthorized(body):
+    return HttpResponse(body, status=401, content_type='application/json')
 
 
 def token_required(f):
     """Decorator to require valid API token"""
     @wraps(f)
     def decorated(request, *args, **kwargs):
-        auth_header = request.headers.get('Authorization', '')
+        # Read META directly; request.headers builds a mapping of every header
+        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
 
         if not auth_header.startswith('Bearer '):
-            return JsonResponse({
-                'error': 'Missing or invalid Authorization header',
-                'code': 'AUTH_REQUIRED'
-            }, status=401)
+            return _unauthorized(_AUTH_REQUIRED_BODY)
 
         token_value = auth_header[7:]  # Remove 'Bearer '
 
         try:
-            api_token = APIToken.objects.select_related('license', 'counter').get(token=token_value)
+            api_token = APIToken.get_cached(token_value)
         except APIToken.DoesNotExist:
-            return JsonResponse({
-                'error': 'Invalid API token',
-                'code': 'INVALID_TOKEN'
-            }, status=401)
+            return _unauthorized(_INVALID_TOKEN_BODY)
 
         if not api_token.is_valid():
-            return JsonResponse({
-                'error': 'Token is expired or inactive',
-                'code': 'TOKEN_EXPIRED'
-            }, status=401)
+            return _unauthorized(_TOKEN_EXPIRED_BODY)
 
         # Update last used
         api_token.update_last_used()
@@ -55,6 +87,7 @@ def token_required(f):
         request.api_token = api_token
         request.license = api_token.license
         request.counter = api_token.counter
+        request.business = Business.get_cached_for_license(api_token.license_id)
 
         return f(request, *args, **kwargs)
     return decorated
@@ -64,6 +97,23 @@ def token_required(f):
 # PUBLIC CONFIG ENDPOINT (No Auth Required)
 # ============================================
 
+_VERSION_RE = re.compile(r'v?(\d+(?:\.\d+)*)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def _version_tuple(value):
+    """
+    Parse the numeric release part of an app version ('1.2.3', 'v1.2',
+    '1.2.3+45') into a tuple of ints padded to three parts, so '1.2' ==
+    '1.2.0'. Returns None when there is no leading number.
+    """
+    match = _VERSION_RE.match(value.strip())
+    if match is None:
+        return None
+    parts = tuple(int(part) for part in match.group(1).split('.'))
+    return parts + (0,) * (3 - len(parts))
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def get_app_config(request):
@@ -91,7 +141,7 @@ def get_app_config(request):
             pass
 
     # Get fallback settings from CompanySettings
-    company_settings = CompanySettings.get_settings()
+    company_settings = CompanySettings.get_cached_settings()
 
     # Use client settings if available, otherwise fall back to company settings
     if client:
@@ -143,7 +193,7 @@ def get_app_config(request):
 
     # Check maintenance mode
     if maintenance_mode:
-        return JsonResponse({
+        return OrjsonResponse({
             'maintenance_mode': True,
             'maintenance_message': maintenance_message,
         })
@@ -201,21 +251,64 @@ def get_app_config(request):
 
     # Check if app needs update
     if app_version and force_update:
-        try:
-            from packaging import version
-            if version.parse(app_version) < version.parse(min_version):
-                response_data['update_required'] = True
-                response_data['update_message'] = f'Please update to version {min_version} or later.'
-        except Exception:
-            pass  # Ignore version parsing errors
+        current, minimum = _version_tuple(app_version), _version_tuple(min_version)
+        # Unparseable versions are ignored
+        if current is not None and minimum is not None and current < minimum:
+            response_data['update_required'] = True
+            response_data['update_message'] = f'Please update to version {min_version} or later.'
 
-    return JsonResponse(response_data)
+    return OrjsonResponse(response_data)
 
 
 # ============================================
 # AUTHENTICATION ENDPOINTS
 # ============================================
 
+def _get_or_claim_activation(license, machine_id, machine_name, ip_address):
+    """
+    Return this machine's activation, creating it if a slot is free.
+    Returns None when the license has no activations left. Call inside
+    transaction.atomic().
+    """
+    try:
+        activation = LicenseActivation.objects.only('id', 'is_active', 'machine_name').get(
+            license=license, machine_id=machine_id
+        )
+    except LicenseActivation.DoesNotExist:
+        pass
+    else:
+        # Update existing activation
+        LicenseActivation.objects.filter(pk=activation.pk).update(
+            last_check=timezone.now(),
+            ip_address=ip_address,
+            **({'machine_name': machine_name} if machine_name else {})
+        )
+        return activation
+
+    # Claim a free slot first; the UPDATE's row lock serializes
+    # concurrent activations of the same license
+    claimed = License.objects.filter(
+        pk=license.pk,
+        current_activations__lt=F('max_activations')
+    ).update(current_activations=F('current_activations') + 1)
+    if not claimed:
+        return None
+    try:
+        with transaction.atomic():
+            return LicenseActivation.objects.create(
+                license=license,
+                machine_id=machine_id,
+                machine_name=machine_name,
+                ip_address=ip_address,
+                is_active=True
+            )
+    except IntegrityError:
+        # Another request activated this machine first; the post-commit
+        # recount corrects the slot claimed above
+        schedule_activation_recount(license.pk)
+        return LicenseActivation.objects.get(license=license, machine_id=machine_id)
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def authenticate(request):
@@ -242,7 +335,7 @@ def authenticate(request):
     }
     """
     try:
-        data = json.loads(request.body)
+        data = json_loads(request.body)
         license_id = data.get('license_id')
         machine_id = data.get('machine_id')
         machine_name = data.get('machine_name', '')
@@ -251,7 +344,7 @@ def authenticate(request):
         app_version = data.get('app_version', '')
 
         if not license_id or not machine_id:
-            return JsonResponse({
+            return OrjsonResponse({
                 'error': 'license_id and machine_id are required',
                 'code': 'MISSING_PARAMS'
             }, status=400)
@@ -260,89 +353,69 @@ def authenticate(request):
         try:
             license = License.objects.get(id=license_id)
         except License.DoesNotExist:
-            return JsonResponse({
+            return OrjsonResponse({
                 'error': 'License not found',
                 'code': 'LICENSE_NOT_FOUND'
             }, status=404)
 
         if not license.is_valid():
-            return JsonResponse({
+            return OrjsonResponse({
                 'error': 'License is not valid',
                 'code': 'LICENSE_INVALID'
             }, status=403)
 
-        # Get or create activation
-        activation, created = LicenseActivation.objects.get_or_create(
-            license=license,
-            machine_id=machine_id,
-            defaults={
-                'machine_name': machine_name,
-                'ip_address': get_client_ip(request),
-                'is_active': True
-            }
-        )
-
-        if created:
-            # Check activation limit
-            if license.current_activations >= license.max_activations:
-                activation.delete()
-                return JsonResponse({
+        with transaction.atomic():
+            activation = _get_or_claim_activation(license, machine_id, machine_name, request.client_ip)
+            if activation is None:
+                return OrjsonResponse({
                     'error': f'Maximum activations ({license.max_activations}) reached',
                     'code': 'MAX_ACTIVATIONS'
                 }, status=403)
 
-            # Increment activation count
-            license.current_activations += 1
-            license.save(update_fields=['current_activations'])
-        else:
-            # Update existing activation
-            activation.machine_name = machine_name or activation.machine_name
-            activation.ip_address = get_client_ip(request)
-            activation.last_check = timezone.now()
-            activation.save()
-
-        # Get or create business for this license
-        business = Business.objects.filter(license=license).first()
-
-        # Get or create counter for this activation
-        counter = None
-        if business:
-            counter, _ = Counter.objects.get_or_create(
-                business=business,
-                activation=activation,
-                defaults={
-                    'name': machine_name or f'Counter {business.counters.count() + 1}',
-                    'device_type': device_type,
-                    'os_info': os_info,
-                    'app_version': app_version,
-                    'is_primary': business.counters.count() == 0
-                }
+            # Get or create business for this license
+            business = Business.objects.filter(license=license).first()
+
+            # Get or create counter for this activation
+            counter = None
+            if business:
+                counter = Counter.objects.filter(business=business, activation=activation).first()
+                if counter is None:
+                    counter_count = business.counters.count()
+                    counter = Counter.objects.create(
+                        business=business,
+                        activation=activation,
+                        name=machine_name or f'Counter {counter_count + 1}',
+                        device_type=device_type,
+                        os_info=os_info,
+                        app_version=app_version,
+                        is_primary=counter_count == 0
+                    )
+                else:
+                    # Update counter info
+                    counter.device_type = device_type or counter.device_type
+                    counter.os_info = os_info or counter.os_info
+                    counter.app_version = app_version or counter.app_version
+                    counter.save(update_fields=['device_type', 'os_info', 'app_version', 'updated_at'])
+
+            # Only the hash is stored, so every authentication gets a new
+            # token. A counter's earlier tokens are revoked (cached copies
+            # are re-checked on use); without a counter the devices cannot
+            # be told apart, so theirs are left alone
+            if counter is not None:
+                APIToken.objects.filter(
+                    license=license, counter=counter, is_active=True
+                ).update(is_active=False)
+            token_value, token_hash = APIToken.generate_token()
+            api_token = APIToken.objects.create(
+                license=license,
+                counter=counter,
+                token_hash=token_hash,
+                name=machine_name or 'API Token',
+                is_active=True
             )
-            # Update counter info
-            counter.device_type = device_type or counter.device_type
-            counter.os_info = os_info or counter.os_info
-            counter.app_version = app_version or counter.app_version
-            counter.save()
-
-        # Create or get API token
-        api_token, _ = APIToken.objects.get_or_create(
-            license=license,
-            counter=counter,
-            defaults={
-                'token': APIToken.generate_token(),
-                'name': machine_name or 'API Token',
-                'is_active': True
-            }
-        )
-
-        # Ensure token is active
-        if not api_token.is_active:
-            api_token.is_active = True
-            api_token.token = APIToken.generate_token()
-            api_token.save()
 
         response_data = {
-            'token': api_token.token,
+            'token': token_value,
             'expires_at': api_token.expires_at.isoformat() if api_token.expires_at else None,
             'business': None,
             'counter': None
@@ -363,15 +436,15 @@ def authenticate(request):
                 'is_primary': counter.is_primary,
             }
 
-        return JsonResponse(response_data)
+        return OrjsonResponse(response_data)
 
     except json.JSONDecodeError:
-        return JsonResponse({
+        return OrjsonResponse({
             'error': 'Invalid JSON',
             'code': 'INVALID_JSON'
         }, status=400)
     except Exception as e:
-        return JsonResponse({
+        return OrjsonResponse({
             'error': str(e),
             'code': 'SERVER_ERROR'
         }, status=500)
@@ -382,9 +455,10 @@ def authenticate(request):
 @token_required
 def logout(request):
     """Invalidate the API token"""
-    request.api_token.is_active = False
-    request.api_token.save()
-    return JsonResponse({'success': True, 'message': 'Logged out successfully'})
+    api_token = request.api_token
+    APIToken.objects.filter(pk=api_token.pk).update(is_active=False)
+    APIToken.forget_cached([api_token.token_hash])
+    return OrjsonResponse({'success': True, 'message': 'Logged out successfully'})
 
 
 # ============================================
@@ -409,27 +483,22 @@ def register_business(request):
     }
     """
     try:
-        data = json.loads(request.body)
-
-        # Get or create business
-        business, created = Business.objects.get_or_create(
-            license=request.license,
-            defaults={'name': data.get('name', 'My Business')}
-        )
+        data = json_loads(request.body)
 
-        # Update business fields
         updatable_fields = [
             'name', 'legal_name', 'business_type', 'email', 'phone', 'website',
             'address_line1', 'address_line2', 'city', 'state', 'country', 'postal_code',
             'gst_number', 'pan_number', 'currency_code', 'currency_symbol', 'date_format'
         ]
+        fields = {field: data[field] for field in updatable_fields if field in data}
+        fields['last_synced_at'] = timezone.now()
 
-        for field in updatable_fields:
-            if field in data:
-                setattr(business, field, data[field])
-
-        business.last_synced_at = timezone.now()
-        business.save()
+        # Create the business in one INSERT, or update only the given fields
+        business, created = Business.objects.update_or_create(
+            license=request.license,
+            defaults=fields,
+            create_defaults={'name': 'My Business', **fields}
+        )
 
         # Create counter if not exists
         if request.counter is None and hasattr(request, 'api_token'):
@@ -448,9 +517,9 @@ def register_business(request):
                 )
                 # Update API token with counter
                 request.api_token.counter = counter
-                request.api_token.save()
+                request.api_token.save(update_fields=['counter'])
 
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'business': {
                 'id': str(business.id),
@@ -463,9 +532,9 @@ def register_business(request):
         })
 
     except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        return OrjsonResponse({'error': 'Invalid JSON'}, status=400)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+        return OrjsonResponse({'error': str(e)}, status=500)
 
 
 @csrf_exempt
@@ -473,15 +542,15 @@ def register_business(request):
 @token_required
 def get_business(request):
     """Get business information"""
-    business = Business.objects.filter(license=request.license).first()
+    business = request.business
 
     if not business:
-        return JsonResponse({
+        return OrjsonResponse({
             'error': 'Business not registered',
             'code': 'BUSINESS_NOT_FOUND'
         }, status=404)
 
-    return JsonResponse({
+    return OrjsonResponse({
         'id': str(business.id),
         'name': business.name,
         'legal_name': business.legal_name,
@@ -501,7 +570,7 @@ def get_business(request):
         'currency_symbol': business.currency_symbol,
         'date_format': business.date_format,
         'logo_url': business.logo.url if business.logo else None,
-        'counters_count': business.counters.count(),
+        'counters_count': business.counters_count,
         'created_at': business.created_at.isoformat(),
         'last_synced_at': business.last_synced_at.isoformat() if business.last_synced_at else None,
     })
@@ -516,24 +585,29 @@ def get_business(request):
 @token_required
 def list_counters(request):
     """List all counters for the business"""
-    business = Business.objects.filter(license=request.license).first()
+    business = request.business
 
     if not business:
-        return JsonResponse({'counters': []})
+        return OrjsonResponse({'counters': []})
 
-    counters = business.counters.select_related('activation').all()
+    # Read-only listing: plain dicts, no model instances
+    counters = business.counters.values(
+        'id', 'name', 'device_name', 'device_type', 'status', 'is_primary',
+        'last_sync_at', 'app_version',
+    )
+    current_id = request.counter.id if request.counter else None
 
-    return JsonResponse({
+    return OrjsonResponse({
         'counters': [{
-            'id': str(c.id),
-            'name': c.name,
-            'device_name': c.device_name,
-            'device_type': c.device_type,
-            'status': c.status,
-            'is_primary': c.is_primary,
-            'last_sync_at': c.last_sync_at.isoformat() if c.last_sync_at else None,
-            'app_version': c.app_version,
-            'is_current': request.counter and str(request.counter.id) == str(c.id)
+            'id': str(c['id']),
+            'name': c['name'],
+            'device_name': c['device_name'],
+            'device_type': c['device_type'],
+            'status': c['status'],
+            'is_primary': c['is_primary'],
+            'last_sync_at': c['last_sync_at'].isoformat() if c['last_sync_at'] else None,
+            'app_version': c['app_version'],
+            'is_current': current_id and c['id'] == current_id
         } for c in counters]
     })
 
@@ -544,25 +618,25 @@ def list_counters(request):
 def update_counter(request, counter_id):
     """Update counter information"""
     try:
-        data = json.loads(request.body)
-        business = Business.objects.filter(license=request.license).first()
+        data = json_loads(request.body)
+        business = request.business
 
         if not business:
-            return JsonResponse({'error': 'Business not found'}, status=404)
+            return OrjsonResponse({'error': 'Business not found'}, status=404)
 
         try:
             counter = business.counters.get(id=counter_id)
         except Counter.DoesNotExist:
-            return JsonResponse({'error': 'Counter not found'}, status=404)
+            return OrjsonResponse({'error': 'Counter not found'}, status=404)
 
         updatable_fields = ['name', 'description', 'device_name', 'device_type', 'os_info', 'app_version', 'sync_enabled']
-        for field in updatable_fields:
-            if field in data:
-                setattr(counter, field, data[field])
+        changed = [field for field in updatable_fields if field in data]
+        for field in changed:
+            setattr(counter, field, data[field])
 
-        counter.save()
+        counter.save(update_fields=changed + ['updated_at'])
 
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'counter': {
                 'id': str(counter.id),
@@ -572,7 +646,7 @@ def update_counter(request, counter_id):
         })
 
     except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        return OrjsonResponse({'error': 'Invalid JSON'}, status=400)
 
 
 # ============================================
@@ -596,16 +670,16 @@ def upload_backup(request):
     - notes: 'Optional notes'
     """
     try:
-        business = Business.objects.filter(license=request.license).first()
+        business = request.business
 
         if not business:
-            return JsonResponse({
+            return OrjsonResponse({
                 'error': 'Business not registered. Register business first.',
                 'code': 'BUSINESS_NOT_FOUND'
             }, status=404)
 
         if 'file' not in request.FILES:
-            return JsonResponse({
+            return OrjsonResponse({
                 'error': 'No file uploaded',
                 'code': 'NO_FILE'
             }, status=400)
@@ -623,23 +697,22 @@ def upload_backup(request):
         record_counts = {}
         if request.POST.get('record_counts'):
             try:
-                record_counts = json.loads(request.POST.get('record_counts'))
+                record_counts = json_loads(request.POST.get('record_counts'))
             except json.JSONDecodeError:
                 pass
 
         # Generate filename
-        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+        now = timezone.now()
+        timestamp = now.strftime('%Y%m%d_%H%M%S')
         counter_name = request.counter.name if request.counter else 'unknown'
         filename = f"backup_{business.id}_{counter_name}_{timestamp}.enc"
 
         # Calculate checksum if not provided
         if not checksum:
-            file_content = uploaded_file.read()
-            checksum = hashlib.sha256(file_content).hexdigest()
-            uploaded_file.seek(0)  # Reset file pointer
+            checksum = _sha256_hexdigest(uploaded_file)
 
-        # Create backup record
-        backup = Backup.objects.create(
+        # Store the file first so the row is written with a single INSERT
+        backup = Backup(
             business=business,
             counter=request.counter,
             filename=filename,
@@ -651,19 +724,27 @@ def upload_backup(request):
             app_version=app_version,
             db_version=db_version,
             record_counts=record_counts,
-            uploaded_at=timezone.now(),
+            uploaded_at=now,
             notes=notes
         )
+        backup.file.save(filename, uploaded_file, save=False)
 
-        # Save file
-        backup.file.save(filename, uploaded_file)
+        # Record the backup and the counter's sync time together; without
+        # ATOMIC_REQUESTS each write would otherwise commit on its own
+        try:
+            with transaction.atomic():
+                backup.save(force_insert=True)
 
-        # Update counter last sync time
-        if request.counter:
-            request.counter.last_sync_at = timezone.now()
-            request.counter.save(update_fields=['last_sync_at'])
+                # Update counter last sync time
+                if request.counter:
+                    request.counter.last_sync_at = now
+                    request.counter.save(update_fields=['last_sync_at'])
+        except Exception:
+            # Don't leave the stored file behind without its row
+            delete_backup_files(backup.file.storage, [backup.file.name])
+            raise
 
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'backup': {
                 'id': str(backup.id),
@@ -675,7 +756,7 @@ def upload_backup(request):
         })
 
     except Exception as e:
-        return JsonResponse({
+        return OrjsonResponse({
             'error': str(e),
             'code': 'UPLOAD_ERROR'
         }, status=500)
@@ -686,41 +767,51 @@ def upload_backup(request):
 @token_required
 def list_backups(request):
     """List all backups for the business"""
-    business = Business.objects.filter(license=request.license).first()
+    business = request.business
 
     if not business:
-        return JsonResponse({'backups': []})
+        return OrjsonResponse({'backups': []})
 
     # Get query params
     limit = int(request.GET.get('limit', 20))
     offset = int(request.GET.get('offset', 0))
     backup_type = request.GET.get('type')
 
-    backups = business.backups.select_related('counter').all()
+    # Read-only listing: plain dicts, no model instances
+    backups = business.backups.values(
+        'id', 'filename', 'file_size', 'backup_type', 'status', 'app_version',
+        'db_version', 'record_counts', 'created_at', 'notes', 'counter__name',
+    )
 
     if backup_type:
         backups = backups.filter(backup_type=backup_type)
 
-    total = backups.count()
-    backups = backups[offset:offset + limit]
+    # The total rides along on each row as a window count, so a non-empty
+    # page needs no separate COUNT query
+    page = list(backups.annotate(total=Window(Count('id')))[offset:offset + limit])
+    if page:
+        total = page[0]['total']
+    else:
+        # An empty first page means there are none; otherwise count
+        total = backups.count() if offset or not limit else 0
 
-    return JsonResponse({
+    return OrjsonResponse({
         'total': total,
         'limit': limit,
         'offset': offset,
         'backups': [{
-            'id': str(b.id),
-            'filename': b.filename,
-            'file_size': b.file_size,
-            'backup_type': b.backup_type,
-            'status': b.status,
-            'app_version': b.app_version,
-            'db_version': b.db_version,
-            'record_counts': b.record_counts,
-            'counter_name': b.counter.name if b.counter else None,
-            'created_at': b.created_at.isoformat(),
-            'notes': b.notes
-        } for b in backups]
+            'id': str(b['id']),
+            'filename': b['filename'],
+            'file_size': b['file_size'],
+            'backup_type': b['backup_type'],
+            'status': b['status'],
+            'app_version': b['app_version'],
+            'db_version': b['db_version'],
+            'record_counts': b['record_counts'],
+            'counter_name': b['counter__name'],
+            'created_at': b['created_at'].isoformat(),
+            'notes': b['notes']
+        } for b in page]
     })
 
 
@@ -729,26 +820,33 @@ def list_backups(request):
 @token_required
 def download_backup(request, backup_id):
     """Download a backup file"""
-    from django.http import FileResponse
-
-    business = Business.objects.filter(license=request.license).first()
+    business = request.business
 
     if not business:
-        return JsonResponse({'error': 'Business not found'}, status=404)
+        return OrjsonResponse({'error': 'Business not found'}, status=404)
 
     try:
         backup = business.backups.get(id=backup_id)
     except Backup.DoesNotExist:
-        return JsonResponse({'error': 'Backup not found'}, status=404)
+        return OrjsonResponse({'error': 'Backup not found'}, status=404)
 
     if not backup.file:
-        return JsonResponse({'error': 'Backup file not available'}, status=404)
-
-    response = FileResponse(
-        backup.file.open('rb'),
-        content_type='application/octet-stream'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{backup.filename}"'
+        return OrjsonResponse({'error': 'Backup file not available'}, status=404)
+
+    accel_prefix = settings.BACKUP_ACCEL_REDIRECT_PREFIX
+    if accel_prefix:
+        # Hand the transfer to the front-end server (nginx internal location)
+        response = HttpResponse(content_type='application/octet-stream')
+        response['X-Accel-Redirect'] = accel_prefix + quote(backup.file.name)
+        response['Content-Disposition'] = content_disposition_header(True, backup.filename)
+    else:
+        # Streamed in blocks (sendfile via wsgi.file_wrapper where available)
+        response = FileResponse(
+            backup.file.open('rb'),
+            as_attachment=True,
+            filename=backup.filename,
+            content_type='application/octet-stream'
+        )
     response['X-Checksum'] = backup.checksum
     response['X-File-Size'] = str(backup.file_size)
 
@@ -760,19 +858,19 @@ def download_backup(request, backup_id):
 @token_required
 def delete_backup(request, backup_id):
     """Delete a backup"""
-    business = Business.objects.filter(license=request.license).first()
+    business = request.business
 
     if not business:
-        return JsonResponse({'error': 'Business not found'}, status=404)
+        return OrjsonResponse({'error': 'Business not found'}, status=404)
 
     try:
         backup = business.backups.get(id=backup_id)
     except Backup.DoesNotExist:
-        return JsonResponse({'error': 'Backup not found'}, status=404)
+        return OrjsonResponse({'error': 'Backup not found'}, status=404)
 
     backup.delete()
 
-    return JsonResponse({'success': True, 'message': 'Backup deleted'})
+    return OrjsonResponse({'success': True, 'message': 'Backup deleted'})
 
 
 @csrf_exempt
@@ -789,14 +887,14 @@ def cleanup_old_backups(request):
     }
     """
     try:
-        data = json.loads(request.body)
+        data = json_loads(request.body)
         keep_count = data.get('keep_count', 10)
         backup_type = data.get('backup_type')
 
-        business = Business.objects.filter(license=request.license).first()
+        business = request.business
 
         if not business:
-            return JsonResponse({'error': 'Business not found'}, status=404)
+            return OrjsonResponse({'error': 'Business not found'}, status=404)
 
         backups = business.backups.all()
         if backup_type:
@@ -805,21 +903,21 @@ def cleanup_old_backups(request):
         # Get IDs to keep
         keep_ids = list(backups.order_by('-created_at')[:keep_count].values_list('id', flat=True))
 
-        # Delete old backups
+        # Delete old backups with one DELETE; their files are removed in
+        # the background afterwards
         to_delete = backups.exclude(id__in=keep_ids)
-        deleted_count = to_delete.count()
+        file_names = list(to_delete.values_list('file', flat=True))
+        deleted_count, _ = to_delete.delete()
+        delete_backup_files(Backup._meta.get_field('file').storage, file_names)
 
-        for backup in to_delete:
-            backup.delete()
-
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'deleted_count': deleted_count,
             'remaining_count': len(keep_ids)
         })
 
     except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        return OrjsonResponse({'error': 'Invalid JSON'}, status=400)
 
 
 # ============================================
@@ -835,17 +933,17 @@ def start_sync(request):
     Returns a sync_log ID to track the sync progress.
     """
     try:
-        data = json.loads(request.body)
+        data = json_loads(request.body)
         sync_type = data.get('sync_type', 'incremental')
         sync_direction = data.get('direction', 'upload')
 
-        business = Business.objects.filter(license=request.license).first()
+        business = request.business
 
         if not business:
-            return JsonResponse({'error': 'Business not found'}, status=404)
+            return OrjsonResponse({'error': 'Business not found'}, status=404)
 
         if not request.counter:
-            return JsonResponse({'error': 'Counter not registered'}, status=400)
+            return OrjsonResponse({'error': 'Counter not registered'}, status=400)
 
         sync_log = SyncLog.objects.create(
             business=business,
@@ -855,14 +953,14 @@ def start_sync(request):
             status='started'
         )
 
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'sync_id': str(sync_log.id),
             'started_at': sync_log.started_at.isoformat()
         })
 
     except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        return OrjsonResponse({'error': 'Invalid JSON'}, status=400)
 
 
 @csrf_exempt
@@ -884,36 +982,35 @@ def complete_sync(request, sync_id):
     }
     """
     try:
-        data = json.loads(request.body)
+        data = json_loads(request.body)
 
-        business = Business.objects.filter(license=request.license).first()
+        business = request.business
 
         if not business:
-            return JsonResponse({'error': 'Business not found'}, status=404)
+            return OrjsonResponse({'error': 'Business not found'}, status=404)
 
         try:
             sync_log = business.sync_logs.get(id=sync_id)
         except SyncLog.DoesNotExist:
-            return JsonResponse({'error': 'Sync log not found'}, status=404)
+            return OrjsonResponse({'error': 'Sync log not found'}, status=404)
 
         # Update sync log
-        sync_log.records_uploaded = data.get('records_uploaded', 0)
-        sync_log.records_downloaded = data.get('records_downloaded', 0)
-        sync_log.conflicts_detected = data.get('conflicts_detected', 0)
-        sync_log.conflicts_resolved = data.get('conflicts_resolved', 0)
-        sync_log.details = data.get('details', {})
-
         sync_log.complete(
             status=data.get('status', 'completed'),
-            error_message=data.get('error_message', '')
+            error_message=data.get('error_message', ''),
+            records_uploaded=data.get('records_uploaded', 0),
+            records_downloaded=data.get('records_downloaded', 0),
+            conflicts_detected=data.get('conflicts_detected', 0),
+            conflicts_resolved=data.get('conflicts_resolved', 0),
+            details=data.get('details', {}),
         )
 
         # Update counter last sync time
         if request.counter:
-            request.counter.last_sync_at = timezone.now()
+            request.counter.last_sync_at = sync_log.completed_at
             request.counter.save(update_fields=['last_sync_at'])
 
-        return JsonResponse({
+        return OrjsonResponse({
             'success': True,
             'sync_id': str(sync_log.id),
             'duration_seconds': sync_log.duration_seconds,
@@ -921,7 +1018,7 @@ def complete_sync(request, sync_id):
         })
 
     except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        return OrjsonResponse({'error': 'Invalid JSON'}, status=400)
 
 
 @csrf_exempt
@@ -929,22 +1026,26 @@ def complete_sync(request, sync_id):
 @token_required
 def sync_history(request):
     """Get sync history for the business"""
-    business = Business.objects.filter(license=request.license).first()
+    business = request.business
 
     if not business:
-        return JsonResponse({'sync_logs': []})
+        return OrjsonResponse({'sync_logs': []})
 
     limit = int(request.GET.get('limit', 20))
     counter_id = request.GET.get('counter_id')
 
-    sync_logs = business.sync_logs.select_related('counter').all()
+    sync_logs = business.sync_logs.select_related('counter').only(
+        'id', 'sync_type', 'sync_direction', 'status', 'records_uploaded',
+        'records_downloaded', 'conflicts_detected', 'started_at', 'completed_at',
+        'duration_seconds', 'counter__name',
+    )
 
     if counter_id:
         sync_logs = sync_logs.filter(counter_id=counter_id)
 
     sync_logs = sync_logs[:limit]
 
-    return JsonResponse({
+    return OrjsonResponse({
         'sync_logs': [{
             'id': str(s.id),
             'sync_type': s.sync_type,
@@ -970,9 +1071,9 @@ def sync_history(request):
 @token_required
 def status(request):
     """Get current status including license, business, and counter info"""
-    business = Business.objects.filter(license=request.license).first()
+    business = request.business
 
-    return JsonResponse({
+    return OrjsonResponse({
         'license': {
             'id': str(request.license.id),
             'type': request.license.license_type,
@@ -985,7 +1086,7 @@ def status(request):
         'business': {
             'id': str(business.id),
             'name': business.name,
-            'counters_count': business.counters.count()
+            'counters_count': business.counters_count
         } if business else None,
         'counter': {
             'id': str(request.counter.id),